@@ -0,0 +1,112 @@
+"""
+JSON 渲染和解析基准测试：DRF JSONRenderer / JSONParser 与 FastJSONRenderer / FastJSONParser
+
+在临时测试数据库中创建条目，比较以下负载的输出大小和耗时：
+- 带长故事内容的条目详情
+- 1000 行条目列表
+- 1000 条的批量创建请求体（解析）
+
+    DB_ENGINE=sqlite3 python benchmarks/json_rendering.py
+"""
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'story_tracker.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from entries.bulk import bulk_create_entries  # noqa: E402
+from entries.models import Entry  # noqa: E402
+from entries.serializers import EntryListSerializer, EntrySerializer  # noqa: E402
+from story_tracker.parsers import FastJSONParser  # noqa: E402
+from story_tracker.renderers import FastJSONRenderer  # noqa: E402
+
+ROWS = 1000
+REPEAT = 5
+NUMBER = 20
+
+
+def create_entries(user):
+    return bulk_create_entries([
+        Entry(
+            user=user,
+            type='item' if i % 2 else 'person',
+            title=f'条目{i}',
+            description='描述' * 20,
+            story_content='<p>那年夏天我们在海边捡到了这枚贝壳。</p>' * (2000 if i == 0 else 20),
+            tags=['标签', f'tag{i % 10}'],
+            contact_info={'phone': '13800000000', 'address': {'city': '上海', 'floor': 8}},
+            importance_score=i % 10 + 1,
+            original_price='1999.90' if i % 2 else None,
+        )
+        for i in range(ROWS)
+    ])
+
+
+def measure(function):
+    return min(timeit.repeat(function, number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+def report(name, standard, fast, size):
+    standard_time, fast_time = measure(standard), measure(fast)
+    print(
+        f'{name:<12} {size / 1024:>9.1f} KB {standard_time * 1000:>12.2f} ms '
+        f'{fast_time * 1000:>9.2f} ms {standard_time / fast_time:>7.1f}x'
+    )
+
+
+def run():
+    user = get_user_model().objects.create_user(username='benchmark', email='benchmark@example.com', password='x')
+    entries = create_entries(user)
+    request = Request(APIRequestFactory().get('/api/entries/'))
+    queryset = Entry.objects.filter(user=user).order_by('pk')
+
+    detail = EntrySerializer(queryset.first(), context={'request': request}).data
+    listing = EntryListSerializer(queryset.prefetch_related('media_files'), many=True, context={'request': request}).data
+    bulk_body = JSONRenderer().render({'create': [
+        {
+            'type': entry.type, 'title': entry.title, 'description': entry.description,
+            'story_content': entry.story_content, 'tags': entry.tags,
+            'contact_info': entry.contact_info, 'importance_score': entry.importance_score,
+        }
+        for entry in entries
+    ]})
+
+    print(f'{"负载":<12} {"大小":>12} {"标准库":>15} {"orjson":>12} {"加速比":>8}')
+    for name, data in [('详情', detail), ('列表', listing)]:
+        rendered = JSONRenderer().render(data)
+        assert FastJSONRenderer().render(data) == rendered
+        report(
+            f'渲染{name}',
+            lambda: JSONRenderer().render(data),
+            lambda: FastJSONRenderer().render(data),
+            len(rendered),
+        )
+
+    assert FastJSONParser().parse(io.BytesIO(bulk_body)) == JSONParser().parse(io.BytesIO(bulk_body))
+    report(
+        '解析批量请求',
+        lambda: JSONParser().parse(io.BytesIO(bulk_body)),
+        lambda: FastJSONParser().parse(io.BytesIO(bulk_body)),
+        len(bulk_body),
+    )
+
+
+if __name__ == '__main__':
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        run()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
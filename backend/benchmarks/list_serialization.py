@@ -0,0 +1,81 @@
+"""
+列表序列化基准测试：EntryListSerializer 与 FastEntryListSerializer
+
+在临时测试数据库中创建条目（每个条目一张主要图片），分别测量 20、100、1000 行的
+查询加序列化耗时。使用当前设置中的数据库引擎，例如：
+
+    DB_ENGINE=sqlite3 python benchmarks/list_serialization.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'story_tracker.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from entries.bulk import bulk_create_entries  # noqa: E402
+from entries.fast_serializers import FastEntryListSerializer  # noqa: E402
+from entries.models import Entry, EntryMedia  # noqa: E402
+from entries.serializers import EntryListSerializer  # noqa: E402
+
+ROW_COUNTS = [20, 100, 1000]
+REPEAT = 5
+
+
+def create_entries(user, count):
+    entries = bulk_create_entries([
+        Entry(
+            user=user,
+            type='item' if i % 2 else 'person',
+            title=f'条目{i}',
+            description='描述' * 20,
+            story_content='<p>故事</p>' * 50,
+            tags=['标签', f'tag{i % 10}'],
+            importance_score=i % 10 + 1,
+        )
+        for i in range(count)
+    ])
+    EntryMedia.objects.bulk_create([
+        EntryMedia(entry=entry, file=f'entry_media/{entry.pk}.jpg', is_primary=True)
+        for entry in entries
+    ])
+
+
+def run():
+    user = get_user_model().objects.create_user(username='benchmark', email='benchmark@example.com', password='x')
+    create_entries(user, max(ROW_COUNTS))
+    request = Request(APIRequestFactory().get('/api/entries/'))
+
+    print(f'{"行数":>6} {"EntryListSerializer":>22} {"快速路径":>12} {"加速比":>8}')
+    for rows in ROW_COUNTS:
+        serializer = EntryListSerializer(context={'request': request})
+        queryset = serializer.optimize_queryset(Entry.objects.filter(user=user).order_by('-updated_at'))[:rows]
+
+        def standard():
+            return EntryListSerializer(queryset.all(), many=True, context={'request': request}).data
+
+        def fast():
+            fast_serializer = FastEntryListSerializer.for_serializer(EntryListSerializer(context={'request': request}))
+            return fast_serializer.serialize(fast_serializer.prepare_queryset(queryset.all()))
+
+        assert standard() == fast()
+        standard_time = min(timeit.repeat(standard, number=1, repeat=REPEAT))
+        fast_time = min(timeit.repeat(fast, number=1, repeat=REPEAT))
+        print(f'{rows:>6} {standard_time * 1000:>19.2f} ms {fast_time * 1000:>9.2f} ms {standard_time / fast_time:>7.1f}x')
+
+
+if __name__ == '__main__':
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        run()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
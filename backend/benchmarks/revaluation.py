@@ -0,0 +1,95 @@
+"""
+批量估值基准测试：逐条 ValuationCalculator 与 RevaluationEngine（单进程和进程池）
+
+在临时数据库中为 10 个用户创建物品条目，逐条估值只测量一部分条目后按条目数折算。
+条目数可以通过第一个参数指定，例如：
+
+    DB_ENGINE=sqlite3 python benchmarks/revaluation.py 200000
+
+进程池中的子进程通过 DB_NAME 环境变量连接同一个临时数据库；SQLite 不支持并发写入，只测量单进程。
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'story_tracker.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from datetime import date  # noqa: E402
+from decimal import Decimal  # noqa: E402
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from entries.bulk import bulk_create_entries  # noqa: E402
+from entries.models import Entry  # noqa: E402
+from valuations.engine import RevaluationEngine  # noqa: E402
+from valuations.models import ValuationRecord  # noqa: E402
+from valuations.utils import ValuationCalculator  # noqa: E402
+
+ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+USERS = 10
+SAMPLE = 2000
+WORKERS = [1] if connection.vendor == 'sqlite' else [1, 4]
+
+CATEGORIES = ['电子产品', '汽车', '家具', '服装', '书籍', '艺术品', '珠宝', '其他', '玩具']
+CONDITIONS = ['new', 'excellent', 'good', 'fair', 'poor', None]
+
+
+def create_items():
+    users = [
+        get_user_model().objects.create_user(username=f'benchmark{i}', email=f'benchmark{i}@example.com', password='x')
+        for i in range(USERS)
+    ]
+    for start in range(0, ITEMS, 10000):
+        bulk_create_entries([
+            Entry(
+                user=users[i % USERS],
+                type='item',
+                title=f'物品{i}',
+                category=CATEGORIES[i % len(CATEGORIES)],
+                condition=CONDITIONS[i % len(CONDITIONS)],
+                original_price=Decimal(i % 5000 + 1) + Decimal('0.99'),
+                acquisition_date=date(2000 + i % 24, i % 12 + 1, i % 28 + 1),
+            )
+            for i in range(start, min(start + 10000, ITEMS))
+        ])
+
+
+def run():
+    create_items()
+
+    calculator = ValuationCalculator()
+    sample = list(Entry.objects.order_by('id')[:SAMPLE])
+    started = time.perf_counter()
+    for entry in sample:
+        calculator.calculate_valuation(entry)
+    per_entry = (time.perf_counter() - started) / len(sample)
+    ValuationRecord.objects.all().delete()
+
+    print(f'{"方式":<16} {"条目数":>10} {"耗时":>12} {"条/秒":>12}')
+    print(f'{"逐条（折算）":<16} {ITEMS:>10} {per_entry * ITEMS:>10.1f} s {1 / per_entry:>12.0f}')
+    for workers in WORKERS:
+        started = time.perf_counter()
+        stats = RevaluationEngine(workers=workers).run()
+        elapsed = time.perf_counter() - started
+        assert stats.valuations == ITEMS
+        print(f'{f"批量 {workers} 进程":<16} {stats.valuations:>10} {elapsed:>10.1f} s {stats.valuations / elapsed:>12.0f}')
+        ValuationRecord.objects.all().delete()
+
+
+if __name__ == '__main__':
+    if connection.vendor == 'sqlite':
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    # 子进程重新加载设置，通过环境变量连接临时数据库
+    os.environ['DB_NAME'] = str(connection.settings_dict['NAME'])
+    try:
+        run()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
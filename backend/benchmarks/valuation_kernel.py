@@ -0,0 +1,61 @@
+"""
+估值计算基准测试：ValuationCalculator 使用的逐条 Decimal 计算 depreciated_value 与向量化 current_values
+
+不访问数据库，使用默认折旧率为合成的物品计算当前价值，逐条计算只测量一部分物品后按物品数折算。
+物品数可以通过第一个参数指定，例如：
+
+    DB_ENGINE=sqlite3 python benchmarks/valuation_kernel.py 1000000
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'story_tracker.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from datetime import date  # noqa: E402
+from decimal import Decimal  # noqa: E402
+
+from valuations.kernel import age_in_months, current_values, depreciated_value  # noqa: E402
+from valuations.rules import RuleTable  # noqa: E402
+
+ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+SAMPLE = 100000
+
+CATEGORIES = ['电子产品', '汽车', '家具', '服装', '书籍', '艺术品', '珠宝', '其他', '玩具']
+CONDITIONS = ['new', 'excellent', 'good', 'fair', 'poor', None]
+
+
+def run():
+    rules = RuleTable([])
+    today = date(2024, 6, 15)
+    prices = [Decimal(i % 500000 + 1).scaleb(-2) for i in range(ITEMS)]
+    acquisition_dates = [date(2000 + i % 24, i % 12 + 1, i % 28 + 1) for i in range(ITEMS)]
+    categories = [CATEGORIES[i % len(CATEGORIES)] for i in range(ITEMS)]
+    conditions = [CONDITIONS[i % len(CONDITIONS)] for i in range(ITEMS)]
+
+    started = time.perf_counter()
+    expected = [
+        depreciated_value(price, age_in_months(acquired, today), category, condition, rules)
+        for price, acquired, category, condition in zip(
+            prices[:SAMPLE], acquisition_dates[:SAMPLE], categories[:SAMPLE], conditions[:SAMPLE]
+        )
+    ]
+    per_item = (time.perf_counter() - started) / SAMPLE
+
+    started = time.perf_counter()
+    values = current_values(prices, acquisition_dates, categories, conditions, rules, today)
+    elapsed = time.perf_counter() - started
+    assert values[:SAMPLE] == expected
+
+    print(f'{"方式":<16} {"物品数":>10} {"耗时":>12} {"条/秒":>12}')
+    print(f'{"逐条（折算）":<16} {ITEMS:>10} {per_item * ITEMS:>10.2f} s {1 / per_item:>12.0f}')
+    print(f'{"向量化":<16} {ITEMS:>10} {elapsed:>10.2f} s {ITEMS / elapsed:>12.0f}')
+
+
+if __name__ == '__main__':
+    run()
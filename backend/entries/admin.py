@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Entry, EntryMedia
+from .models import Entry, EntryMedia, ImportanceSnapshot, TagCount
 
 
 class EntryMediaInline(admin.TabularInline):
@@ -53,15 +53,6 @@ class EntryAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """优化查询性能"""
         return super().get_queryset(request).select_related('user')
-    
-    def save_model(self, request, obj, form, change):
-        """保存时更新重要度评估时间"""
-        if change:  # 如果是编辑操作
-            original = Entry.objects.get(pk=obj.pk)
-            importance_fields = ['importance_score', 'emotional_value', 'practical_value', 'frequency_of_use', 'duration_owned']
-            if any(getattr(original, field) != getattr(obj, field) for field in importance_fields):
-                obj.update_importance_evaluation()
-        super().save_model(request, obj, form, change)
 
 
 @admin.register(EntryMedia)
@@ -73,4 +64,26 @@ class EntryMediaAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         """优化查询性能"""
-        return super().get_queryset(request).select_related('entry', 'entry__user')
\ No newline at end of file
+        return super().get_queryset(request).select_related('entry', 'entry__user')
+
+
+@admin.register(TagCount)
+class TagCountAdmin(admin.ModelAdmin):
+    """标签计数管理"""
+    list_display = ('tag', 'user', 'count')
+    search_fields = ('tag', 'user__email', 'user__username')
+    readonly_fields = ('user', 'tag', 'count')
+
+
+@admin.register(ImportanceSnapshot)
+class ImportanceSnapshotAdmin(admin.ModelAdmin):
+    """重要度快照管理 - 只读，快照由条目保存时自动追加"""
+    list_display = ('entry', 'recorded_at', 'importance_score', 'calculated_importance')
+    list_filter = ('recorded_at',)
+    search_fields = ('entry__title',)
+    readonly_fields = ('entry', 'recorded_at', 'importance_score', 'emotional_value', 'practical_value',
+                       'frequency_of_use', 'duration_owned', 'calculated_importance')
+    
+    def get_queryset(self, request):
+        """优化查询性能"""
+        return super().get_queryset(request).select_related('entry')
@@ -0,0 +1,203 @@
+"""
+条目统计聚合
+
+用少量条件聚合查询计算统计数据，避免逐项 count() 和在Python中遍历整个集合。
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber, TruncMonth, TruncYear
+
+from . import tagging
+from .models import Entry
+
+# by_type 响应中各类型的分组键，以及去重列出的分面字段和对应的响应键；
+# 未列出的类型使用 "<类型>s" 作为分组键且没有分面
+TYPE_GROUPS = {
+    'item': ('items', 'category', 'categories'),
+    'person': ('persons', 'relationship', 'relationships'),
+}
+
+# 时间线支持的时间粒度
+TIMELINE_INTERVALS = {
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+
+
+def _plain(queryset):
+    """去掉排序和预取，聚合查询不需要它们"""
+    return queryset.order_by().prefetch_related(None)
+
+
+def _has_story_q():
+    """有故事内容的条件"""
+    return ~Q(story_content__isnull=True) & ~Q(story_content='')
+
+
+def entry_counts(queryset):
+    """一次查询计算总数、各类型数量和有故事的条目数"""
+    return _plain(queryset).aggregate(
+        total_count=Count('id'),
+        item_count=Count('id', filter=Q(type='item')),
+        person_count=Count('id', filter=Q(type='person')),
+        with_story_count=Count('id', filter=_has_story_q()),
+    )
+
+
+def importance_distribution(queryset):
+    """一次 GROUP BY 查询计算重要度分布（1-10分）"""
+    distribution = {str(i): 0 for i in range(1, 11)}
+    rows = (
+        _plain(queryset)
+        .values('importance_score')
+        .annotate(count=Count('id'))
+        .values_list('importance_score', 'count')
+    )
+    for score, count in rows:
+        if str(score) in distribution:
+            distribution[str(score)] = count
+    return distribution
+
+
+def category_facets(queryset):
+    """一次查询获取物品类别和人物关系的去重列表"""
+    categories = set()
+    relationships = set()
+    rows = (
+        _plain(queryset)
+        .filter(Q(type='item') & ~Q(category='') | Q(type='person') & ~Q(relationship=''))
+        .values_list('type', 'category', 'relationship')
+        .distinct()
+    )
+    for entry_type, category, relationship in rows:
+        if entry_type == 'item' and category:
+            categories.add(category)
+        elif entry_type == 'person' and relationship:
+            relationships.add(relationship)
+    return sorted(categories), sorted(relationships)
+
+
+def type_group(entry_type):
+    """返回类型的 (分组键, 分面字段, 分面响应键)"""
+    return TYPE_GROUPS.get(entry_type, (f'{entry_type}s', None, None))
+
+
+def type_overview(queryset):
+    """
+    一次 GROUP BY 查询计算每个类型的条目数和分面值
+
+    按 (类型, 各分面字段) 分组计数，再在 Python 中按类型汇总，查询数与类型数量无关。
+    返回 {类型: {'count': 条目数, 分面响应键: 去重排序后的值}}，没有条目的类型计数为 0。
+    """
+    entry_types = [entry_type for entry_type, _ in Entry.ENTRY_TYPES]
+    facet_fields = sorted({type_group(entry_type)[1] for entry_type in entry_types} - {None})
+    counts = Counter()
+    facets = defaultdict(set)
+    rows = (
+        _plain(queryset)
+        .values('type', *facet_fields)
+        .annotate(count=Count('id'))
+        .values_list('type', *facet_fields, 'count')
+    )
+    for entry_type, *values, count in rows:
+        counts[entry_type] += count
+        value = dict(zip(facet_fields, values)).get(type_group(entry_type)[1])
+        if value:
+            facets[entry_type].add(value)
+
+    overview = {}
+    for entry_type in entry_types:
+        _, field, facet_key = type_group(entry_type)
+        overview[entry_type] = {'count': counts[entry_type]}
+        if field:
+            overview[entry_type][facet_key] = sorted(facets[entry_type])
+    return overview
+
+
+def recent_by_type(queryset, limit=5):
+    """
+    每个类型最近更新的 limit 个条目
+
+    ROW_NUMBER() OVER (PARTITION BY type ORDER BY updated_at DESC) 在一次查询中完成所有类型的 top-N，
+    结果按类型和排名排序。
+    """
+    return queryset.annotate(
+        type_rank=Window(
+            RowNumber(),
+            partition_by=F('type'),
+            order_by=[F('updated_at').desc(), F('id').desc()],
+        )
+    ).filter(type_rank__lte=limit).order_by('type', 'type_rank')
+
+
+def timeline_buckets(queryset, interval='month'):
+    """
+    按事件日期的月份或年份汇总条目
+
+    一次 GROUP BY (时间段, 货币) 查询，时间段在数据库中截断。返回按时间段升序的列表，
+    每项包含时间段起始日期、条目数、平均重要度和按货币分别合计的原价（没有原价的条目不计入）。
+    """
+    price_places = Decimal(1).scaleb(-Entry._meta.get_field('original_price').decimal_places)
+    rows = (
+        _plain(queryset)
+        .annotate(period=TIMELINE_INTERVALS[interval]('event_date'))
+        .values('period', 'currency')
+        .annotate(
+            count=Count('id'),
+            importance_total=Sum('importance_score'),
+            price_total=Sum('original_price'),
+        )
+        .order_by('period', 'currency')
+    )
+
+    buckets = []
+    for row in rows:
+        if not buckets or buckets[-1]['period'] != row['period']:
+            buckets.append({'period': row['period'], 'count': 0, 'importance_total': 0, 'prices': {}})
+        bucket = buckets[-1]
+        bucket['count'] += row['count']
+        bucket['importance_total'] += row['importance_total']
+        if row['price_total'] is not None:
+            bucket['prices'][row['currency']] = str(row['price_total'].quantize(price_places))
+
+    return [
+        {
+            'period': bucket['period'].isoformat(),
+            'count': bucket['count'],
+            'average_importance': round(bucket['importance_total'] / bucket['count'], 2),
+            'total_original_price': bucket['prices'],
+        }
+        for bucket in buckets
+    ]
+
+
+def top_tags(queryset, limit=20):
+    """统计最常用的标签，只读取 tags 列"""
+    tag_counts = Counter()
+    for tags in _plain(queryset).values_list('tags', flat=True).iterator():
+        tag_counts.update(tags or [])
+    return sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+
+def entry_statistics(queryset, user=None):
+    """
+    计算 statistics 端点的全部数据
+
+    传入 user 表示 queryset 是该用户未经过滤的全部条目，此时标签统计直接读取
+    维护好的 TagCount 计数表。
+    """
+    counts = entry_counts(queryset)
+    categories, relationships = category_facets(queryset)
+    return {
+        'total_count': counts['total_count'],
+        'item_count': counts['item_count'],
+        'person_count': counts['person_count'],
+        'with_story_count': counts['with_story_count'],
+        'without_story_count': counts['total_count'] - counts['with_story_count'],
+        'importance_distribution': importance_distribution(queryset),
+        'categories': categories,
+        'relationships': relationships,
+        'tags': tagging.top_tags(user) if user is not None else top_tags(queryset),
+    }
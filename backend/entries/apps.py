@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class EntriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'entries'
\ No newline at end of file
+    name = 'entries'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,178 @@
+"""
+条目批量写入
+
+逐条校验后使用 bulk_create / bulk_update 在一个事务中写入，绕过逐行的 Entry.save，
+派生字段、标签索引、搜索索引和重要度快照在这里批量维护。
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_generation
+from .history import record_importance
+from .models import Entry
+from .search import index_entries, unindex_entries
+from .serializers import EntryCreateUpdateSerializer
+from .signals import bulk_write
+from .tagging import sync_tags_bulk
+
+# 单次请求允许的最大条目数（创建、更新、删除合计）
+MAX_BULK_SIZE = 5000
+
+BATCH_SIZE = 500
+
+
+def is_entry_id(value):
+    """请求中的条目 id 必须是整数，布尔值不算"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def bulk_create_entries(entries):
+    """批量创建条目，补齐派生字段并同步标签和搜索索引"""
+    for entry in entries:
+        entry.refresh_derived_fields()
+    created = Entry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    sync_tags_bulk([(entry, [], entry.tags) for entry in created])
+    index_entries(created)
+    record_importance(created)
+    bump_generation(*{entry.user_id for entry in created})
+    for entry in created:
+        entry._state.adding = False
+        entry._snapshot_loaded_values()
+    return created
+
+
+def bulk_update_entries(entries):
+    """批量更新已加载并修改过的条目，只写入变化的列"""
+    now = timezone.now()
+    fields = set()
+    tag_changes = []
+    search_changed = []
+    importance_changed = []
+    changed_entries = []
+    for entry in entries:
+        changed = set(entry.get_changed_fields())
+        if not changed:
+            continue
+        changed |= entry.refresh_derived_fields(changed)
+        entry.updated_at = now
+        fields |= changed | {'updated_at'}
+        changed_entries.append(entry)
+        if 'tags' in changed:
+            tag_changes.append((entry, entry.get_loaded_value('tags', []), entry.tags))
+        if 'search_document' in changed:
+            search_changed.append(entry)
+        if changed & set(Entry.IMPORTANCE_FIELDS):
+            importance_changed.append(entry)
+
+    if changed_entries:
+        Entry.objects.bulk_update(changed_entries, sorted(fields), batch_size=BATCH_SIZE)
+        sync_tags_bulk(tag_changes)
+        index_entries(search_changed)
+        record_importance(importance_changed)
+        bump_generation(*{entry.user_id for entry in changed_entries})
+        for entry in changed_entries:
+            entry._snapshot_loaded_values()
+    return changed_entries
+
+
+def bulk_delete_entries(queryset):
+    """批量删除条目，统一扣减标签计数并移除搜索索引，返回被删除的条目id"""
+    entries = list(queryset.only('id', 'user_id', 'tags'))
+    if not entries:
+        return []
+    with bulk_write():
+        Entry.objects.filter(id__in=[entry.pk for entry in entries]).delete()
+    sync_tags_bulk([(entry, entry.tags, []) for entry in entries])
+    unindex_entries([entry.pk for entry in entries])
+    bump_generation(*{entry.user_id for entry in entries})
+    return [entry.pk for entry in entries]
+
+
+class BulkEntryProcessor:
+    """
+    处理批量请求
+
+    请求格式：{"create": [...], "update": [{"id": 1, ...}], "delete": [1, 2]}
+    校验失败的条目不会写入，其余条目在同一事务中写入。
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+        self.errors = []
+
+    def error(self, operation, index, errors):
+        """记录单个条目的错误"""
+        self.errors.append({'operation': operation, 'index': index, 'errors': errors})
+
+    def validate_create(self, items):
+        """校验待创建的条目，返回 (序号, 未保存的 Entry) 列表"""
+        valid = []
+        for index, item in enumerate(items):
+            serializer = EntryCreateUpdateSerializer(data=item, context={'request': self.request})
+            if serializer.is_valid():
+                valid.append((index, Entry(user=self.user, **serializer.validated_data)))
+            else:
+                self.error('create', index, serializer.errors)
+        return valid
+
+    def validate_update(self, items):
+        """校验待更新的条目并把修改应用到已加载的实例上"""
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        instances = Entry.objects.filter(user=self.user, id__in=[pk for pk in ids if is_entry_id(pk)]).in_bulk()
+        valid = []
+        seen = set()
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            if not is_entry_id(pk) or pk not in instances:
+                self.error('update', index, {'id': ['条目不存在']})
+                continue
+            if pk in seen:
+                self.error('update', index, {'id': ['同一条目在一次请求中只能更新一次']})
+                continue
+            seen.add(pk)
+            entry = instances[pk]
+            data = {key: value for key, value in item.items() if key != 'id'}
+            serializer = EntryCreateUpdateSerializer(entry, data=data, partial=True, context={'request': self.request})
+            if not serializer.is_valid():
+                self.error('update', index, serializer.errors)
+                continue
+            for field, value in serializer.validated_data.items():
+                setattr(entry, field, value)
+            valid.append((index, entry))
+        return valid
+
+    def process(self, data):
+        """校验并写入，返回逐条结果和错误"""
+        create_items = data.get('create') or []
+        update_items = data.get('update') or []
+        delete_items = data.get('delete') or []
+
+        to_create = self.validate_create(create_items)
+        to_update = self.validate_update(update_items)
+        delete_ids = []
+        for index, pk in enumerate(delete_items):
+            if is_entry_id(pk):
+                delete_ids.append((index, pk))
+            else:
+                self.error('delete', index, {'id': ['无效的条目id']})
+
+        with transaction.atomic():
+            created = bulk_create_entries([entry for _, entry in to_create])
+            bulk_update_entries([entry for _, entry in to_update])
+            deleted = set()
+            if delete_ids:
+                deleted = set(bulk_delete_entries(
+                    Entry.objects.filter(user=self.user, id__in=[pk for _, pk in delete_ids])
+                ))
+
+        for index, pk in delete_ids:
+            if pk not in deleted:
+                self.error('delete', index, {'id': ['条目不存在']})
+
+        return {
+            'created': [{'index': index, 'id': entry.pk} for (index, _), entry in zip(to_create, created)],
+            'updated': [{'index': index, 'id': entry.pk} for index, entry in to_update],
+            'deleted': sorted(deleted),
+            'errors': self.errors,
+        }
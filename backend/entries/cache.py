@@ -0,0 +1,149 @@
+"""
+条目读取接口的按用户版本化响应缓存
+
+每个用户有一个版本号（generation），用户的 Entry、EntryMedia 或 ValuationRecord 发生任何写入时
+版本号加一。响应缓存键包含版本号，因此失效只需一次 incr，旧版本的缓存不会再被读到，随超时自然淘汰。
+
+缓存后端通过 settings.CACHES['entries'] 配置，默认为所有进程共享的文件缓存；
+进程内存（locmem）只在单进程部署下保证及时失效。
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+ENTRY_CACHE_ALIAS = 'entries'
+
+# 随缓存响应一起保存并在命中时恢复的响应头
+CACHED_HEADERS = ['ETag', 'Last-Modified', 'Cache-Control']
+
+
+def get_entry_cache():
+    return caches[ENTRY_CACHE_ALIAS]
+
+
+class CacheStats:
+    """按动作统计的缓存命中和未命中次数（进程内）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def record(self, action, hit):
+        with self._lock:
+            self._counts[action]['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = {action: dict(values) for action, values in self._counts.items()}
+        for values in counts.values():
+            total = values['hits'] + values['misses']
+            values['hit_rate'] = round(values['hits'] / total, 4) if total else 0.0
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
+
+def _generation_key(user_id):
+    return f'entries:generation:{user_id}'
+
+
+def get_generation(user_id):
+    """
+    读取用户的缓存版本号
+
+    版本号以当前时间初始化：版本号被淘汰后重新初始化也不会与仍在缓存中的旧版本冲突。
+    """
+    cache = get_entry_cache()
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key) or time.time_ns()
+    return generation
+
+
+def _bump(user_id):
+    cache = get_entry_cache()
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_generation(*user_ids):
+    """
+    使用户的响应缓存失效
+
+    在事务中时立即失效一次（同一事务内的后续读取能看到新数据），提交后再失效一次，
+    避免并发请求在提交前把旧数据写入新版本的缓存。
+    """
+    for user_id in set(user_ids):
+        if user_id is None:
+            continue
+        _bump(user_id)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(partial(_bump, user_id))
+
+
+def response_cache_key(request, action, variant=''):
+    """
+    由用户、版本号、动作和完整请求地址生成缓存键
+
+    variant 用于响应还依赖于请求之外的状态（例如当天日期、规则版本）的情况。
+    """
+    user = request.user
+    # 加入注册时间，避免删除用户后 id 被复用时读到旧用户的缓存
+    namespace = f'{user.pk}:{user.date_joined.timestamp()}'
+    request_key = '|'.join([
+        request.get_host(), request.get_full_path(), getattr(request, 'accepted_media_type', '') or '', variant
+    ])
+    digest = hashlib.sha1(request_key.encode()).hexdigest()
+    return f'entries:response:{namespace}:{get_generation(user.pk)}:{action}:{digest}'
+
+
+def cached_response(request, action, compute, variant=''):
+    """
+    返回缓存的响应数据，未命中时调用 compute() 生成响应并缓存
+
+    缓存的响应带有 ETag / Last-Modified 时，命中后同样支持条件请求。
+    """
+    cache = get_entry_cache()
+    key = response_cache_key(request, action, variant)
+    cached = cache.get(key)
+    if cached is not None:
+        stats.record(action, hit=True)
+        data, headers = cached
+        last_modified = headers.get('Last-Modified')
+        not_modified = get_conditional_response(
+            request,
+            etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+        )
+        if not_modified is not None:
+            return not_modified
+        response = Response(data)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    stats.record(action, hit=False)
+    response = compute()
+    if response.status_code == 200:
+        headers = {header: response[header] for header in CACHED_HEADERS if response.has_header(header)}
+        cache.set(key, (response.data, headers))
+    return response
+
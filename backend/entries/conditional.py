@@ -0,0 +1,102 @@
+"""
+条目资源的条件请求（ETag / Last-Modified）
+
+在序列化之前计算校验值：详情基于条目的 updated_at，列表基于过滤后查询集的
+最大 updated_at 和条目数，键集分页基于当前页条目的 updated_at。客户端携带的校验值匹配时直接返回 304。
+列表和分页只使用 ETag：删除条目不会改变最大 updated_at，只比较日期的 Last-Modified 无法发现这种变化。
+媒体文件变化时会更新所属条目的 updated_at（见 signals.py），因此也会反映在校验值中。
+"""
+import hashlib
+from datetime import datetime, time
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .pagination import entry_value
+
+
+def _representation_last_modified(updated_at, daily):
+    """
+    响应内容的最后修改时间
+
+    daily 为 True 表示响应包含随日期变化的字段（age_in_days），最后修改时间不早于今天零点。
+    """
+    if updated_at is None or not daily:
+        return updated_at
+    midnight = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return max(updated_at, midnight)
+
+
+def _build_etag(request, *parts):
+    """由用户、请求地址和校验值生成弱 ETag"""
+    key = '|'.join(str(part) for part in [
+        request.user.pk, request.get_host(), request.get_full_path(), *parts
+    ])
+    return 'W/' + quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+
+def detail_validators(request, queryset, pk, daily=True):
+    """返回单个条目的 (etag, last_modified)，条目不存在时返回 None"""
+    updated_at = (
+        queryset.filter(pk=pk).order_by().prefetch_related(None)
+        .values_list('updated_at', flat=True).first()
+    )
+    if updated_at is None:
+        return None
+    last_modified = _representation_last_modified(updated_at, daily)
+    return _build_etag(request, pk, last_modified.isoformat()), last_modified
+
+
+def list_summary(queryset):
+    """一条聚合查询得到过滤后查询集的最大 updated_at 和条目数"""
+    return queryset.order_by().prefetch_related(None).aggregate(
+        last_updated=Max('updated_at'), count=Count('id')
+    )
+
+
+def list_validators(request, summary, daily=False):
+    """根据 list_summary 的结果返回条目列表的 (etag, None)，列表不提供 Last-Modified"""
+    last_modified = _representation_last_modified(summary['last_updated'], daily)
+    stamp = last_modified.isoformat() if last_modified else ''
+    return _build_etag(request, summary['count'], stamp), None
+
+
+def page_validators(request, entries, daily=False):
+    """
+    根据已取出的一页条目（实例或 values() 行）返回 (etag, None)
+
+    用于不统计总数的键集分页：一页的内容完全由其中条目的 id 和 updated_at 决定，不提供 Last-Modified。
+    """
+    updated = [(entry_value(entry, 'id'), entry_value(entry, 'updated_at')) for entry in entries]
+    stamps = [f'{pk}:{updated_at.isoformat()}' for pk, updated_at in updated]
+    last_modified = _representation_last_modified(
+        max((updated_at for _, updated_at in updated), default=None), daily
+    )
+    stamp = last_modified.isoformat() if last_modified else ''
+    return _build_etag(request, stamp, *stamps), None
+
+
+def not_modified_response(request, validators):
+    """校验值匹配时返回 304（或 412）响应，否则返回 None"""
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def set_validator_headers(response, validators):
+    """在响应上设置 ETag 和 Last-Modified，要求客户端每次使用前重新验证"""
+    if validators is None or response.status_code != 200:
+        return response
+    etag, last_modified = validators
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
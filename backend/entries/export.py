@@ -0,0 +1,157 @@
+"""
+条目流式导出
+
+通过 queryset.iterator(chunk_size=...) 逐批读取条目行（PostgreSQL 使用服务端游标），
+每批一次性查询媒体文件和估值记录，边读边写入 StreamingHttpResponse，内存占用与条目总数无关。
+"""
+import csv
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import models
+from django.http import StreamingHttpResponse
+
+from .models import Entry, EntryMedia
+
+# 导出的条目字段（search_document 为内部搜索字段，不导出）
+EXPORT_FIELDS = [
+    field.attname for field in Entry._meta.concrete_fields
+    if field.name not in ('user', 'search_document')
+]
+
+# CSV 中以 JSON 字符串写入的列
+JSON_EXPORT_FIELDS = {
+    field.attname for field in Entry._meta.concrete_fields if isinstance(field, models.JSONField)
+}
+
+MEDIA_EXPORT_FIELDS = ['id', 'type', 'file', 'caption', 'is_primary', 'created_at']
+
+VALUATION_EXPORT_FIELDS = [
+    'calculated_at', 'original_price', 'current_value', 'depreciation_rate',
+    'category_factor', 'condition_factor', 'age_in_months', 'methodology',
+]
+
+# 可附加的关联数据
+EXPORT_INCLUDES = ['media', 'valuations']
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+CHUNK_SIZE = 2000
+
+
+def _plain_value(value):
+    """把日期、时间和 Decimal 转换为 JSON/CSV 友好的值"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _chunks(iterator, size):
+    chunk = []
+    for row in iterator:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Echo:
+    """csv.writer 使用的伪文件对象，直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+class EntryExporter:
+    """
+    把条目查询集导出为 NDJSON 或 CSV
+
+    includes 可包含 media（媒体文件及其URL）和 valuations（估值历史）。
+    """
+
+    def __init__(self, queryset, request=None, includes=(), chunk_size=CHUNK_SIZE):
+        self.queryset = queryset.prefetch_related(None)
+        self.request = request
+        self.includes = [name for name in EXPORT_INCLUDES if name in includes]
+        self.chunk_size = chunk_size
+        self.file_storage = EntryMedia._meta.get_field('file').storage
+
+    def iter_rows(self):
+        """逐批产出条目字典，附带请求的关联数据"""
+        rows = self.queryset.values(*EXPORT_FIELDS).iterator(chunk_size=self.chunk_size)
+        for chunk in _chunks(rows, self.chunk_size):
+            ids = [row['id'] for row in chunk]
+            related = {name: getattr(self, f'_load_{name}')(ids) for name in self.includes}
+            for row in chunk:
+                row = {key: _plain_value(value) for key, value in row.items()}
+                for name, values in related.items():
+                    row[name] = values.get(row['id'], [])
+                yield row
+
+    def _load_media(self, entry_ids):
+        media = {}
+        queryset = EntryMedia.objects.filter(entry_id__in=entry_ids).values('entry_id', *MEDIA_EXPORT_FIELDS)
+        for row in queryset:
+            entry_id = row.pop('entry_id')
+            row = {key: _plain_value(value) for key, value in row.items()}
+            row['file_url'] = self._file_url(row['file'])
+            media.setdefault(entry_id, []).append(row)
+        return media
+
+    def _load_valuations(self, entry_ids):
+        ValuationRecord = apps.get_model('valuations', 'ValuationRecord')
+        valuations = {}
+        queryset = (
+            ValuationRecord.objects.filter(entry_id__in=entry_ids)
+            .order_by('entry_id', 'calculated_at')
+            .values('entry_id', *VALUATION_EXPORT_FIELDS)
+        )
+        for row in queryset:
+            entry_id = row.pop('entry_id')
+            valuations.setdefault(entry_id, []).append({key: _plain_value(value) for key, value in row.items()})
+        return valuations
+
+    def _file_url(self, name):
+        if not name:
+            return None
+        url = self.file_storage.url(name)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+    def iter_ndjson(self):
+        """每行一个 JSON 对象，每批合并为一次输出"""
+        for chunk in _chunks(self.iter_rows(), self.chunk_size):
+            yield ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk)
+
+    def iter_csv(self):
+        """CSV 输出，列表和关联数据以 JSON 字符串写入单元格"""
+        columns = EXPORT_FIELDS + self.includes
+        json_columns = JSON_EXPORT_FIELDS | set(self.includes)
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for chunk in _chunks(self.iter_rows(), self.chunk_size):
+            lines = []
+            for row in chunk:
+                lines.append(writer.writerow([
+                    json.dumps(row[column], ensure_ascii=False) if column in json_columns else row[column]
+                    for column in columns
+                ]))
+            yield ''.join(lines)
+
+    def response(self, output='ndjson', filename='entries'):
+        """构造流式响应"""
+        content_type, extension = EXPORT_FORMATS[output]
+        content = self.iter_csv() if output == 'csv' else self.iter_ndjson()
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+        return response
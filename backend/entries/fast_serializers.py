@@ -0,0 +1,143 @@
+"""
+列表序列化的快速路径
+
+EntryListSerializer 会为每一行构造 Entry 实例并逐字段走 DRF 的 get_attribute / to_representation。
+这里根据序列化器当前的字段预先编译每个字段的转换函数，直接处理 values() 查询得到的字典行，
+主要图片每页一次查询获取。输出与 EntryListSerializer 完全一致。
+"""
+from datetime import datetime
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .models import EntryMedia
+
+
+def _has_story(row):
+    story_content = row['story_content']
+    return bool(story_content and story_content.strip())
+
+
+def _identity(value):
+    return value
+
+
+# to_representation 对已是目标类型的值原样返回的字段类型
+_PASSTHROUGH_FIELDS = (serializers.ReadOnlyField, serializers.JSONField)
+_PASSTHROUGH_TYPES = {
+    serializers.CharField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+}
+
+
+def _datetime_converter(field):
+    """
+    预先解析时区和输出格式的 DateTimeField 转换
+
+    与 DateTimeField.to_representation 相同：带时区的值转换到字段时区后按 ISO 8601 输出，
+    UTC 以 Z 结尾；其他情况交给 DRF 处理。
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def to_representation(value):
+        if not isinstance(value, datetime) or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return to_representation
+
+
+def _model_field_converter(field):
+    """为模型字段对应的 DRF 字段生成转换函数，None 与 DRF 一样直接输出 None"""
+    source = field.source
+    to_representation = field.to_representation
+    if isinstance(field, _PASSTHROUGH_FIELDS) and not getattr(field, 'binary', False):
+        to_representation = _identity
+    elif type(field) is serializers.DateTimeField:
+        to_representation = _datetime_converter(field)
+    elif type(field) in _PASSTHROUGH_TYPES:
+        expected_type = _PASSTHROUGH_TYPES[type(field)]
+        field_to_representation = field.to_representation
+
+        def to_representation(value):
+            return value if type(value) is expected_type else field_to_representation(value)
+
+    def convert(row, primary_images):
+        value = row[source]
+        return None if value is None else to_representation(value)
+    return convert
+
+
+class FastEntryListSerializer:
+    """
+    基于 values() 行的只读列表序列化器
+
+    通过 for_serializer() 从已应用字段选择的 EntryListSerializer 构造；
+    存在无法快速处理的字段（例如展开的 media_files）时返回 None，由调用方使用原序列化器。
+    """
+
+    # 依赖多列或关联数据的字段
+    computed_fields = {
+        'has_story': lambda row, primary_images: _has_story(row),
+        'primary_image': lambda row, primary_images: primary_images.get(row['id']),
+    }
+
+    def __init__(self, serializer, columns):
+        self.request = serializer.context.get('request')
+        self.columns = sorted(columns)
+        self.with_primary_image = 'primary_image' in serializer.fields
+        self.file_storage = EntryMedia._meta.get_field('file').storage
+        self.converters = []
+        for name, field in serializer.fields.items():
+            if name in self.computed_fields:
+                converter = self.computed_fields[name]
+            else:
+                converter = _model_field_converter(field)
+            self.converters.append((name, converter))
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        model_fields = {field.name for field in serializer.Meta.model._meta.concrete_fields}
+        for name, field in serializer.fields.items():
+            if name in cls.computed_fields:
+                continue
+            if field.source not in model_fields or isinstance(field, serializers.RelatedField):
+                return None
+        columns = serializer.get_required_columns()
+        if columns is None:
+            return None
+        return cls(serializer, columns)
+
+    def prepare_queryset(self, queryset):
+        """把条目查询集转换为只包含所需列的 values() 查询集"""
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def load_primary_images(self, entry_ids):
+        """一次查询当前页所有条目的主要图片URL"""
+        urls = {}
+        queryset = EntryMedia.objects.filter(
+            entry_id__in=entry_ids, is_primary=True, type='image'
+        ).values_list('entry_id', 'file')
+        for entry_id, name in queryset:
+            if entry_id in urls:
+                continue
+            url = self.file_storage.url(name)
+            urls[entry_id] = self.request.build_absolute_uri(url) if self.request else url
+        return urls
+
+    def serialize(self, rows):
+        rows = list(rows)
+        primary_images = {}
+        if self.with_primary_image and rows:
+            primary_images = self.load_primary_images([row['id'] for row in rows])
+        converters = self.converters
+        return [
+            {name: convert(row, primary_images) for name, convert in converters}
+            for row in rows
+        ]
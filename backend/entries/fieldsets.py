@@ -0,0 +1,75 @@
+"""
+稀疏字段集
+
+客户端通过 ?fields=、?exclude= 选择返回的字段，通过 ?expand= 展开默认不返回的关联数据。
+选择结果同时决定查询集的 only() 列和预取，未请求的列和关联数据不会被加载。
+"""
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+EXPAND_PARAM = 'expand'
+
+# 无论选择哪些字段都会加载的列：权限检查、排序游标、条件请求和按类型分组需要
+ALWAYS_LOADED_COLUMNS = ['id', 'user', 'type', 'created_at', 'updated_at', 'importance_score', 'event_date']
+
+
+def _param_set(request, param):
+    value = request.query_params.get(param, '')
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    支持 ?fields= / ?exclude= / ?expand= 的序列化器混入类
+
+    expandable_fields: 可展开的字段名 -> 返回字段实例的函数
+    column_dependencies: 非模型字段 -> 计算该字段需要的模型列
+    prefetch_dependencies: 字段名 -> 需要对查询集执行的预取（接收并返回查询集的函数）
+    """
+    expandable_fields = {}
+    column_dependencies = {}
+    prefetch_dependencies = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+
+        expand = _param_set(request, EXPAND_PARAM)
+        for name, build_field in self.expandable_fields.items():
+            if name in expand and name not in self.fields:
+                self.fields[name] = build_field()
+
+        requested = _param_set(request, FIELDS_PARAM)
+        excluded = _param_set(request, EXCLUDE_PARAM)
+        for name in list(self.fields):
+            if (requested and name not in requested and name not in expand) or name in excluded:
+                self.fields.pop(name)
+
+    def get_required_columns(self):
+        """
+        返回序列化当前字段需要加载的模型列
+
+        存在无法确定依赖的字段时返回 None，由调用方加载全部列。
+        """
+        model_fields = {field.name for field in self.Meta.model._meta.concrete_fields}
+        columns = set(ALWAYS_LOADED_COLUMNS)
+        for name, field in self.fields.items():
+            if name in self.column_dependencies:
+                columns.update(self.column_dependencies[name])
+            elif field.source in model_fields:
+                columns.add(field.source)
+            elif name not in self.prefetch_dependencies:
+                return None
+        return columns
+
+    def optimize_queryset(self, queryset):
+        """按当前字段裁剪查询集的列并只预取需要的关联数据"""
+        columns = self.get_required_columns()
+        if columns is not None:
+            queryset = queryset.only(*sorted(columns))
+        for name, prefetch in self.prefetch_dependencies.items():
+            if name in self.fields:
+                queryset = prefetch(queryset)
+        return queryset
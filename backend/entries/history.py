@@ -0,0 +1,83 @@
+"""
+条目重要度历史
+
+条目新建或重要度字段（Entry.IMPORTANCE_FIELDS）变化时追加一条 ImportanceSnapshot。
+快照在条目所在的事务中立即写入，事务或保存点回滚时随之丢弃；批量写入的条目每批一次 bulk_create。
+不在事务中保存的条目由 Entry.save 在同一个事务中写入条目和快照。
+
+读取时使用 LTTB（Largest-Triangle-Three-Buckets）在服务端降采样：保留的都是真实的快照，
+峰值和拐点不会被平均掉，返回的点数不超过请求的上限。
+"""
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import ImportanceSnapshot
+
+BATCH_SIZE = 500
+
+# 时间序列默认和最多返回的点数
+DEFAULT_POINTS = 200
+MIN_POINTS = 3
+MAX_POINTS = 1000
+
+SNAPSHOT_VALUE_FIELDS = ['recorded_at', 'importance_score', 'emotional_value', 'practical_value',
+                         'frequency_of_use', 'duration_owned', 'calculated_importance']
+
+
+def record_importance(entries, using=None):
+    """为条目的当前重要度追加快照，一次 bulk_create 写入"""
+    snapshots = [ImportanceSnapshot.from_entry(entry) for entry in entries]
+    if snapshots:
+        ImportanceSnapshot.objects.using(using or DEFAULT_DB_ALIAS).bulk_create(snapshots, batch_size=BATCH_SIZE)
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的下标
+
+    points 是按 x 升序的 (x, y) 序列。保留首尾两点，其余点按顺序分成 threshold - 2 个桶，
+    每个桶保留与上一个保留点、下一个桶的平均点构成的三角形面积最大的点。
+    """
+    count = len(points)
+    if count <= threshold:
+        return list(range(count))
+    if threshold < MIN_POINTS:
+        raise ValueError(f'threshold 不能小于 {MIN_POINTS}')
+
+    bucket_size = (count - 2) / (threshold - 2)
+    selected = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        following = points[end:min(int((bucket + 2) * bucket_size) + 1, count)] or points[-1:]
+        average_x = sum(x for x, _ in following) / len(following)
+        average_y = sum(y for _, y in following) / len(following)
+
+        previous_x, previous_y = points[previous]
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((previous_x - average_x) * (y - previous_y) - (previous_x - x) * (average_y - previous_y))
+            if area > best_area:
+                best, best_area = index, area
+        selected.append(best)
+        previous = best
+    selected.append(count - 1)
+    return selected
+
+
+def importance_series(entry, max_points=DEFAULT_POINTS):
+    """
+    条目的重要度时间序列，返回 (快照总数, 降采样后的快照行)
+
+    按综合重要度降采样：先逐行读取快照时间和综合重要度，再只取出保留的快照的全部重要度字段。
+    """
+    snapshots = ImportanceSnapshot.objects.filter(entry=entry).order_by('recorded_at', 'id')
+    ids, points = [], []
+    for pk, recorded_at, importance in (
+        snapshots.values_list('id', 'recorded_at', 'calculated_importance').iterator(chunk_size=BATCH_SIZE)
+    ):
+        ids.append(pk)
+        points.append((recorded_at.timestamp(), importance))
+    selected = [ids[index] for index in lttb(points, max_points)]
+    return len(ids), list(snapshots.filter(id__in=selected).values(*SNAPSHOT_VALUE_FIELDS))
@@ -0,0 +1,304 @@
+"""
+条目批量导入
+
+从 NDJSON 或 CSV 文件流式读取条目（格式与 export 导出的一致），按批次写入：
+条目、媒体文件、故事、估值记录和重要度快照都通过 bulk_create 写入，PostgreSQL 上可选使用 COPY。
+绕过逐行的 Entry.save，派生字段、标签索引和搜索索引在批次内统一维护，内存占用只与批次大小有关。
+"""
+import csv
+import io
+import json
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .cache import bump_generation
+from .export import JSON_EXPORT_FIELDS
+from .models import Entry, EntryMedia, ImportanceSnapshot
+from .search import index_entries
+from .tagging import sync_tags_bulk
+
+# 导入时忽略的条目字段：主键、所属用户和派生字段由导入过程生成
+IGNORED_ENTRY_FIELDS = {'id', 'user', 'calculated_importance', 'event_date', 'search_document'}
+
+IMPORT_ENTRY_FIELDS = {
+    field.attname: field for field in Entry._meta.concrete_fields
+    if field.name not in IGNORED_ENTRY_FIELDS
+}
+
+# 附加在条目行上的关联数据及其可导入的字段
+RELATED_KEYS = ['media', 'story', 'valuations']
+
+MEDIA_IMPORT_FIELDS = ['type', 'file', 'caption', 'is_primary', 'created_at']
+
+STORY_IMPORT_FIELDS = ['content', 'created_at', 'updated_at']
+
+VALUATION_IMPORT_FIELDS = [
+    'calculated_at', 'original_price', 'current_value', 'depreciation_rate',
+    'category_factor', 'condition_factor', 'age_in_months', 'methodology',
+]
+
+IMPORT_FORMATS = ['ndjson', 'csv']
+
+BATCH_SIZE = 1000
+
+
+def read_ndjson(stream):
+    """逐行读取 NDJSON，产出 (行号, 数据)"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as exc:
+            yield line_number, exc
+
+
+def read_csv(stream):
+    """逐行读取 CSV，JSON 列和关联数据列按 JSON 解析，可为空的列中空字符串视为 NULL"""
+    json_columns = JSON_EXPORT_FIELDS | set(RELATED_KEYS)
+    nullable = {attname for attname, field in IMPORT_ENTRY_FIELDS.items() if field.null}
+    reader = csv.DictReader(stream)
+    # 表头占第 1 行
+    for line_number, row in enumerate(reader, start=2):
+        try:
+            data = {}
+            for key, value in row.items():
+                if key in json_columns:
+                    data[key] = json.loads(value) if value else None
+                elif key in nullable and value == '':
+                    data[key] = None
+                else:
+                    data[key] = value
+        except ValueError as exc:
+            yield line_number, exc
+        else:
+            yield line_number, data
+
+
+@contextmanager
+def explicit_timestamps(fields):
+    """
+    临时关闭时间字段的 auto_now/auto_now_add，让 bulk_create 写入对象上已有的值
+
+    修改的是模型字段本身，只在单线程的导入命令中使用。
+    """
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in flags:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _copy_text(value):
+    """把值转换为 PostgreSQL COPY 文本格式"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+class ImportStats:
+    """导入进度统计"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.rows = 0
+        self.entries = 0
+        self.media = 0
+        self.stories = 0
+        self.valuations = 0
+        self.errors = []
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+
+class EntryImporter:
+    """
+    把条目数据批量导入到指定用户名下
+
+    use_copy 为 True 时在 PostgreSQL 上使用 COPY 写入，主键通过序列预先分配。
+    progress 回调在每个批次完成后以 ImportStats 调用。
+    """
+
+    def __init__(self, user, batch_size=BATCH_SIZE, use_copy=False, progress=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.progress = progress
+        self.Story = apps.get_model('stories', 'Story')
+        self.ValuationRecord = apps.get_model('valuations', 'ValuationRecord')
+
+    def import_file(self, path, file_format):
+        """从文件导入，返回 ImportStats"""
+        reader = read_csv if file_format == 'csv' else read_ndjson
+        with open(path, encoding='utf-8', newline='') as stream:
+            return self.import_rows(reader(stream))
+
+    def import_rows(self, rows):
+        """导入 (行号, 数据) 序列，每满一个批次写入一次"""
+        stats = ImportStats()
+        batch = []
+        for line_number, data in rows:
+            stats.rows += 1
+            try:
+                batch.append(self.build(data))
+            except ValidationError as exc:
+                stats.errors.append((line_number, exc.message_dict if hasattr(exc, 'error_dict') else exc.messages))
+            except (TypeError, ValueError) as exc:
+                stats.errors.append((line_number, [str(exc)]))
+            if len(batch) >= self.batch_size:
+                self.write_batch(batch, stats)
+                batch = []
+        if batch:
+            self.write_batch(batch, stats)
+        return stats
+
+    def build(self, data):
+        """校验一行数据，返回 (条目, 媒体文件, 故事, 估值记录)，不写数据库"""
+        if isinstance(data, Exception):
+            raise ValueError(f'无法解析: {data}')
+        if not isinstance(data, dict):
+            raise ValueError('每行必须是一个对象')
+
+        entry = Entry(user=self.user)
+        for attname, value in data.items():
+            if attname in IMPORT_ENTRY_FIELDS:
+                setattr(entry, attname, value)
+        entry.full_clean(exclude=['user'], validate_unique=False, validate_constraints=False)
+
+        media = [self.build_related(EntryMedia, item, MEDIA_IMPORT_FIELDS) for item in self.related_list(data, 'media')]
+        story = data.get('story')
+        if story:
+            story = self.build_related(self.Story, {'content': story} if isinstance(story, str) else story, STORY_IMPORT_FIELDS)
+        valuations = [
+            self.build_related(self.ValuationRecord, item, VALUATION_IMPORT_FIELDS)
+            for item in self.related_list(data, 'valuations')
+        ]
+        return entry, media, story or None, valuations
+
+    def related_list(self, data, key):
+        items = data.get(key) or []
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ValueError(f'{key} 必须是对象数组')
+        return items
+
+    def build_related(self, model, item, fields):
+        """构造并校验关联对象，所属条目在条目写入后再设置"""
+        if not isinstance(item, dict):
+            raise ValueError(f'{model._meta.verbose_name} 必须是对象')
+        obj = model(**{field: item[field] for field in fields if item.get(field) is not None})
+        obj.full_clean(exclude=['entry', 'story'], validate_unique=False, validate_constraints=False)
+        return obj
+
+    def write_batch(self, batch, stats):
+        """在一个事务中写入一个批次的条目及其关联数据"""
+        now = timezone.now()
+        entries = [entry for entry, _, _, _ in batch]
+        for entry in entries:
+            # 保留归档中的故事修改时间，没有时按新建条目处理
+            archived_story_modified = entry.story_last_modified
+            entry.refresh_derived_fields()
+            entry.story_last_modified = archived_story_modified or entry.story_last_modified
+
+        media, stories, valuations = [], [], []
+        with transaction.atomic():
+            self.insert(Entry, entries, now)
+            sync_tags_bulk([(entry, [], entry.tags) for entry in entries])
+            index_entries(entries)
+
+            for entry, entry_media, story, entry_valuations in batch:
+                for obj in [*entry_media, *([story] if story else []), *entry_valuations]:
+                    obj.entry = entry
+                media.extend(entry_media)
+                if story:
+                    stories.append(story)
+                valuations.extend(entry_valuations)
+            self.insert(EntryMedia, media, now)
+            self.insert(self.Story, stories, now)
+            self.insert(self.ValuationRecord, valuations, now)
+            # 重要度历史从归档中的评估时间开始，没有时使用创建时间
+            self.insert(ImportanceSnapshot, [
+                ImportanceSnapshot.from_entry(entry, entry.importance_last_evaluated or entry.created_at)
+                for entry in entries
+            ], now)
+            bump_generation(self.user.pk)
+
+        stats.entries += len(entries)
+        stats.media += len(media)
+        stats.stories += len(stories)
+        stats.valuations += len(valuations)
+        if self.progress:
+            self.progress(stats)
+
+    def insert(self, model, objs, now):
+        """
+        写入一批对象
+
+        自动时间字段保留归档中的值，缺失时使用当前时间。写入前直接设置这些值，
+        bulk_create 期间关闭字段的 auto_now/auto_now_add，避免写入后再逐批 bulk_update。
+        """
+        if not objs:
+            return
+        auto_fields = [
+            field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        ]
+        for obj in objs:
+            for field in auto_fields:
+                if not getattr(obj, field.attname):
+                    setattr(obj, field.attname, now)
+
+        if self.use_copy:
+            self.copy_insert(model, objs)
+            return
+
+        with explicit_timestamps(auto_fields):
+            model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def copy_insert(self, model, objs):
+        """使用 PostgreSQL COPY 写入，主键通过序列预先分配以便关联数据引用"""
+        table = model._meta.db_table
+        fields = model._meta.concrete_fields
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [table, len(objs)]
+            )
+            for obj, (pk,) in zip(objs, cursor.fetchall()):
+                obj.pk = pk
+                obj._state.adding = False
+
+            buffer = io.StringIO()
+            for obj in objs:
+                values = []
+                for field in fields:
+                    value = getattr(obj, field.attname)
+                    if isinstance(field, models.JSONField):
+                        value = None if value is None else json.dumps(value, cls=field.encoder)
+                    else:
+                        value = field.get_db_prep_save(value, connection)
+                    values.append(_copy_text(value))
+                buffer.write('\t'.join(values) + '\n')
+            buffer.seek(0)
+
+            columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+            cursor.copy_expert(f'COPY {connection.ops.quote_name(table)} ({columns}) FROM STDIN', buffer)
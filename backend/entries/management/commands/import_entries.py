@@ -0,0 +1,80 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from entries.importer import BATCH_SIZE, IMPORT_FORMATS, EntryImporter
+
+User = get_user_model()
+
+# 最多输出的错误行数
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = '从 NDJSON 或 CSV 文件批量导入条目（含媒体文件、故事和估值记录）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='导入文件路径')
+        parser.add_argument('--user', required=True, help='条目所属用户（用户名）')
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help='文件格式，默认根据扩展名判断',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'每批写入的条目数，默认 {BATCH_SIZE}',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='使用 PostgreSQL COPY 写入',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'文件不存在: {path}')
+
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'用户不存在: {options["user"]}')
+
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format == 'jsonl':
+            file_format = 'ndjson'
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError('无法判断文件格式，请使用 --format 指定')
+
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size 必须大于 0')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy 只支持 PostgreSQL')
+
+        importer = EntryImporter(
+            user,
+            batch_size=options['batch_size'],
+            use_copy=options['copy'],
+            progress=self.report_progress,
+        )
+        stats = importer.import_file(path, file_format)
+
+        for line_number, errors in stats.errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(f'第 {line_number} 行: {errors}')
+        if len(stats.errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f'另有 {len(stats.errors) - MAX_REPORTED_ERRORS} 行错误未显示')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'导入完成：{stats.entries} 个条目，{stats.media} 个媒体文件，'
+                f'{stats.stories} 个故事，{stats.valuations} 条估值记录，'
+                f'跳过 {len(stats.errors)} 行，{stats.rows_per_second:.0f} 行/秒'
+            )
+        )
+
+    def report_progress(self, stats):
+        self.stdout.write(f'已处理 {stats.rows} 行，导入 {stats.entries} 个条目，{stats.rows_per_second:.0f} 行/秒')
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from entries.tagging import rebuild_tag_counts
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = '根据条目数据重建标签计数表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='users',
+            help='只重建指定用户（用户名），可重复使用',
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['users']:
+            users = list(User.objects.filter(username__in=options['users']))
+            missing = set(options['users']) - {user.username for user in users}
+            if missing:
+                raise CommandError(f'用户不存在: {", ".join(sorted(missing))}')
+
+        row_count = rebuild_tag_counts(users)
+        self.stdout.write(
+            self.style.SUCCESS(f'标签计数重建完成，共写入 {row_count} 条记录')
+        )
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:49
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+
+def backfill_calculated_importance(apps, schema_editor):
+    """根据各维度分数回填综合重要度"""
+    Entry = apps.get_model('entries', 'Entry')
+    Entry.objects.update(
+        calculated_importance=Round(
+            F('emotional_value') * 0.35 +
+            F('practical_value') * 0.25 +
+            F('frequency_of_use') * 0.25 +
+            F('duration_owned') * 0.15,
+            2
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0002_update_entry_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='calculated_importance',
+            field=models.FloatField(default=5.0, editable=False, help_text='综合重要度加权分数，保存时根据各维度分数自动计算'),
+        ),
+        migrations.RunPython(backfill_calculated_importance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['user', 'calculated_importance'], name='entries_user_id_fb0015_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import Counter
+
+# 标签列的长度，更长的标签无法写入（PostgreSQL 会报错），回填时跳过
+MAX_TAG_LENGTH = 255
+
+
+def backfill_tag_counts(apps, schema_editor):
+    """根据已有条目回填标签计数，跳过超过标签列长度的标签并报告数量"""
+    Entry = apps.get_model('entries', 'Entry')
+    TagCount = apps.get_model('entries', 'TagCount')
+    
+    per_user = {}
+    skipped = 0
+    for user_id, tags in Entry.objects.order_by().values_list('user_id', 'tags').iterator(chunk_size=2000):
+        tags = tags or []
+        valid = [tag for tag in tags if len(tag) <= MAX_TAG_LENGTH]
+        skipped += len(tags) - len(valid)
+        per_user.setdefault(user_id, Counter()).update(valid)
+    if skipped:
+        print(f'\n  跳过了 {skipped} 个超过 {MAX_TAG_LENGTH} 个字符的标签', end='')
+    
+    TagCount.objects.bulk_create(
+        [
+            TagCount(user_id=user_id, tag=tag, count=count)
+            for user_id, counts in per_user.items()
+            for tag, count in counts.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('entries', '0003_entry_calculated_importance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '标签计数',
+                'verbose_name_plural': '标签计数',
+                'db_table': 'entry_tag_counts',
+                'indexes': [models.Index(fields=['user', '-count'], name='entry_tag_c_user_id_fc0ca3_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tagcount',
+            constraint=models.UniqueConstraint(fields=('user', 'tag'), name='unique_user_tag_count'),
+        ),
+        migrations.RunPython(backfill_tag_counts, migrations.RunPython.noop),
+    ]
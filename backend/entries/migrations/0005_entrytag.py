@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# 标签列的长度，更长的标签无法写入（PostgreSQL 会报错），回填时跳过
+MAX_TAG_LENGTH = 255
+
+
+def backfill_entry_tags(apps, schema_editor):
+    """根据已有条目的 tags 字段回填标签索引，跳过超过标签列长度的标签并报告数量"""
+    Entry = apps.get_model('entries', 'Entry')
+    EntryTag = apps.get_model('entries', 'EntryTag')
+    
+    batch = []
+    skipped = 0
+    for entry_id, user_id, tags in Entry.objects.order_by().values_list('id', 'user_id', 'tags').iterator(chunk_size=2000):
+        tags = set(tags or [])
+        valid = {tag for tag in tags if len(tag) <= MAX_TAG_LENGTH}
+        skipped += len(tags) - len(valid)
+        batch.extend(EntryTag(entry_id=entry_id, user_id=user_id, tag=tag) for tag in valid)
+        if len(batch) >= 1000:
+            EntryTag.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        EntryTag.objects.bulk_create(batch, ignore_conflicts=True)
+    if skipped:
+        print(f'\n  跳过了 {skipped} 个超过 {MAX_TAG_LENGTH} 个字符的标签', end='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('entries', '0004_tagcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntryTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=255)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='entries.entry')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entry_tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '条目标签',
+                'verbose_name_plural': '条目标签',
+                'db_table': 'entry_tags',
+                'indexes': [models.Index(fields=['user', 'tag', 'entry'], name='entry_tags_user_id_b95792_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='entrytag',
+            constraint=models.UniqueConstraint(fields=('entry', 'tag'), name='unique_entry_tag'),
+        ),
+        migrations.RunPython(backfill_entry_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:54
+
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# 以下为迁移编写时 entries.search 的表名和分词逻辑的副本，迁移不随应用代码变化
+SQLITE_FTS_TABLE = 'entries_fts'
+
+_WORD_RE = re.compile(r'[^\W_]+')
+_CJK_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+
+
+def _cjk_tokens(run):
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text):
+    tokens = []
+    for word in _WORD_RE.findall(text or ''):
+        position = 0
+        for match in _CJK_RE.finditer(word):
+            if match.start() > position:
+                tokens.append(word[position:match.start()].lower())
+            tokens.extend(_cjk_tokens(match.group()))
+            position = match.end()
+        if position < len(word):
+            tokens.append(word[position:].lower())
+    return tokens
+
+
+def build_search_document(entry):
+    parts = [
+        entry.title,
+        entry.description,
+        strip_tags(entry.story_content or ''),
+        ' '.join(str(tag) for tag in entry.tags or []),
+    ]
+    return ' '.join(tokenize(' '.join(part for part in parts if part)))
+
+
+def backfill_search_document(apps, schema_editor):
+    """为已有条目生成搜索文档"""
+    Entry = apps.get_model('entries', 'Entry')
+
+    batch = []
+    for entry in Entry.objects.only('id', 'title', 'description', 'story_content', 'tags').iterator(chunk_size=1000):
+        entry.search_document = build_search_document(entry)
+        batch.append(entry)
+        if len(batch) >= 1000:
+            Entry.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    if batch:
+        Entry.objects.bulk_update(batch, ['search_document'])
+
+
+def create_search_index(apps, schema_editor):
+    """创建数据库相关的全文索引：PostgreSQL 使用 GIN 表达式索引，SQLite 使用 FTS5"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX entries_search_document_gin ON entries "
+            "USING gin (to_tsvector('simple'::regconfig, COALESCE(search_document, '')))"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5(search_document)"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_document) "
+            f"SELECT id, search_document FROM entries"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS entries_search_document_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0005_entrytag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
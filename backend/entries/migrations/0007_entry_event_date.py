@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:52
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_event_date(apps, schema_editor):
+    """按获得日期、认识日期、创建日期（UTC）的顺序回填事件日期"""
+    Entry = apps.get_model('entries', 'Entry')
+    Entry.objects.update(
+        event_date=Coalesce(
+            'acquisition_date',
+            'meeting_date',
+            TruncDate('created_at', tzinfo=datetime.timezone.utc),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0006_entry_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='event_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_event_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='entry',
+            name='event_date',
+            field=models.DateField(blank=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['user', 'event_date'], name='entries_user_id_f3b9f2_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_snapshots(apps, schema_editor):
+    """为已有条目写入一条初始快照，时间取最近一次重要度评估时间，没有时取创建时间"""
+    Entry = apps.get_model('entries', 'Entry')
+    ImportanceSnapshot = apps.get_model('entries', 'ImportanceSnapshot')
+    fields = ['importance_score', 'emotional_value', 'practical_value', 'frequency_of_use',
+              'duration_owned', 'calculated_importance']
+    snapshots = []
+    for entry in Entry.objects.only('id', 'created_at', 'importance_last_evaluated', *fields).iterator(chunk_size=2000):
+        snapshots.append(ImportanceSnapshot(
+            entry_id=entry.pk,
+            recorded_at=entry.importance_last_evaluated or entry.created_at,
+            **{field: getattr(entry, field) for field in fields},
+        ))
+        if len(snapshots) >= 2000:
+            ImportanceSnapshot.objects.bulk_create(snapshots)
+            snapshots = []
+    ImportanceSnapshot.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0007_entry_event_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('importance_score', models.IntegerField()),
+                ('emotional_value', models.IntegerField()),
+                ('practical_value', models.IntegerField()),
+                ('frequency_of_use', models.IntegerField()),
+                ('duration_owned', models.IntegerField()),
+                ('calculated_importance', models.FloatField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='importance_snapshots', to='entries.entry')),
+            ],
+            options={
+                'verbose_name': '重要度快照',
+                'verbose_name_plural': '重要度快照',
+                'db_table': 'entry_importance_snapshots',
+                'ordering': ['recorded_at', 'id'],
+                'indexes': [models.Index(fields=['entry', 'recorded_at'], name='entry_impor_entry_i_18430e_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,44 @@
-from django.db import models
+import copy
+from datetime import timezone as dt_timezone
+
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
 User = get_user_model()
 
+# 单个标签的最大长度，与 EntryTag / TagCount 的 tag 列一致
+MAX_TAG_LENGTH = 255
+
+
+def tag_errors(tags):
+    """检查标签列表，返回错误信息列表"""
+    if not isinstance(tags, list):
+        return ['标签必须是列表']
+    if any(len(str(tag)) > MAX_TAG_LENGTH for tag in tags):
+        return [f'单个标签不能超过 {MAX_TAG_LENGTH} 个字符']
+    return []
+
+
+class EntryQuerySet(models.QuerySet):
+    """条目查询集 - 封装列表页常用的预取策略"""
+
+    def with_primary_image(self):
+        """
+        预取每个条目的主要图片
+
+        只加载 is_primary=True 且 type='image' 的媒体，结果存放在
+        ``primary_images`` 属性中，整页条目只需一次额外查询。
+        """
+        return self.prefetch_related(
+            models.Prefetch(
+                'media_files',
+                queryset=EntryMedia.objects.filter(is_primary=True, type='image'),
+                to_attr='primary_images',
+            )
+        )
+
 
 class Entry(models.Model):
     """条目模型 - 支持物品和人物两种类型"""
@@ -41,6 +75,20 @@ class Entry(models.Model):
         ('other', '其他'),
     ]
     
+    # 综合重要度各维度的权重
+    IMPORTANCE_WEIGHTS = {
+        'emotional_value': 0.35,
+        'practical_value': 0.25,
+        'frequency_of_use': 0.25,
+        'duration_owned': 0.15,
+    }
+    
+    # 变化时需要更新重要度评估时间的字段
+    IMPORTANCE_FIELDS = ['importance_score', *IMPORTANCE_WEIGHTS]
+    
+    # 决定事件日期的字段，按优先级排列
+    EVENT_DATE_FIELDS = ['acquisition_date', 'meeting_date', 'created_at']
+    
     # 基本信息
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='entries')
     type = models.CharField(max_length=10, choices=ENTRY_TYPES)
@@ -114,6 +162,11 @@ class Entry(models.Model):
         help_text='拥有时长重要性 1-10分'
     )
     importance_last_evaluated = models.DateTimeField(null=True, blank=True)
+    calculated_importance = models.FloatField(
+        default=5.0,
+        editable=False,
+        help_text='综合重要度加权分数，保存时根据各维度分数自动计算'
+    )
     
     # 视觉定制
     theme = models.CharField(max_length=50, default='default', help_text='主题样式')
@@ -124,10 +177,18 @@ class Entry(models.Model):
     tags = models.JSONField(default=list, blank=True, help_text='标签列表')
     is_private = models.BooleanField(default=False, help_text='是否私有')
     
+    # 事件日期：获得日期、认识日期或创建日期中第一个有值的，保存时自动维护，用于日期范围查询和排序
+    event_date = models.DateField(blank=True, editable=False)
+    
+    # 全文搜索文档（标题、描述、故事和标签分词后的结果），保存时自动生成
+    search_document = models.TextField(blank=True, default='', editable=False)
+    
     # 时间戳
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = EntryQuerySet.as_manager()
+    
     class Meta:
         db_table = 'entries'
         verbose_name = '条目'
@@ -138,45 +199,151 @@ class Entry(models.Model):
             models.Index(fields=['user', 'importance_score']),
             models.Index(fields=['user', 'created_at']),
             models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', 'calculated_importance']),
+            models.Index(fields=['user', 'event_date']),
         ]
     
     def __str__(self):
         return f"{self.get_type_display()}: {self.title}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """从数据库加载时记录字段原值，用于保存时只写入变化的列"""
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_loaded_values()
+        return instance
+    
+    def refresh_from_db(self, using=None, fields=None):
+        """重新加载后同步字段原值"""
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot_loaded_values(fields)
+    
+    def _snapshot_loaded_values(self, fields=None):
+        """记录已加载字段的当前值；JSON字段深拷贝，避免原地修改影响比较"""
+        if fields is None or not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        deferred = self.get_deferred_fields()
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred or (fields is not None and field.name not in fields and field.attname not in fields):
+                continue
+            value = getattr(self, field.attname)
+            if isinstance(field, models.JSONField):
+                value = copy.deepcopy(value)
+            self._loaded_values[field.attname] = value
+    
+    def get_loaded_value(self, field_name, default=None):
+        """获取字段从数据库加载时的原值"""
+        field = self._meta.get_field(field_name)
+        return getattr(self, '_loaded_values', {}).get(field.attname, default)
+    
+    def get_changed_fields(self):
+        """返回自加载以来发生变化的字段名；没有原值记录时从数据库读取一次"""
+        if not hasattr(self, '_loaded_values'):
+            attnames = [field.attname for field in self._meta.concrete_fields]
+            self._loaded_values = Entry.objects.filter(pk=self.pk).values(*attnames).first() or {}
+        
+        deferred = self.get_deferred_fields()
+        changed = []
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname in deferred:
+                continue
+            if field.attname not in self._loaded_values:
+                # 加载时被延迟、之后又被赋值的字段
+                changed.append(field.name)
+            elif getattr(self, field.attname) != self._loaded_values[field.attname]:
+                changed.append(field.name)
+        return changed
+    
     def save(self, *args, **kwargs):
-        """重写save方法，自动更新故事修改时间"""
-        # 如果有故事内容且是新创建的条目，设置故事修改时间
-        if not self.pk and self.story_content and self.story_content.strip():
-            self.story_last_modified = timezone.now()
-        elif self.pk:  # 如果是更新操作
-            try:
-                old_instance = Entry.objects.get(pk=self.pk)
-                if old_instance.story_content != self.story_content:
-                    self.story_last_modified = timezone.now()
-            except Entry.DoesNotExist:
-                pass
-        super().save(*args, **kwargs)
+        """
+        重写save方法
+
+        更新已有条目时只写入变化的列，并在同一条 UPDATE 中维护派生字段：
+        综合重要度、故事修改时间、重要度评估时间和搜索文档。
+        新建或重要度字段变化时追加重要度快照。
+
+        没有任何字段变化时仍然更新 updated_at 并发送 post_save；
+        传入 skip_unchanged=True 时跳过写入，也不发送信号。
+        """
+        skip_unchanged = kwargs.pop('skip_unchanged', False)
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        changed = None if adding else set(self.get_changed_fields())
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            changed = update_fields if changed is None else changed & update_fields
+        elif changed is not None:
+            if not changed and skip_unchanged:
+                return
+            update_fields = changed | {'updated_at'}
+        
+        derived = self.refresh_derived_fields(changed)
+        
+        if update_fields is not None:
+            kwargs['update_fields'] = list(update_fields | derived)
+        if not (adding or changed & set(self.IMPORTANCE_FIELDS)):
+            super().save(*args, **kwargs)
+            self._snapshot_loaded_values()
+            return
+        
+        from .history import record_importance
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        # 条目和快照在同一个事务中写入，回滚时一起丢弃；已在事务中时不再创建保存点
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            record_importance([self], using=using)
+        self._snapshot_loaded_values()
     
-    @property
-    def calculated_importance(self):
-        """计算综合重要度分数"""
+    def refresh_derived_fields(self, changed=None):
+        """
+        根据变化的字段重新计算派生字段，返回被更新的派生字段名集合
+
+        changed 为 None 表示新建条目，所有派生字段都需要计算。
+        批量写入绕过 save() 时也通过这里保持派生字段一致。
+        """
+        from .search import SEARCH_DOCUMENT_FIELDS, build_search_document
+        
+        adding = changed is None
+        
+        def touched(fields):
+            return adding or bool(changed & set(fields))
+        
+        now = timezone.now()
+        derived = set()
+        if touched(self.IMPORTANCE_WEIGHTS):
+            self.calculated_importance = self.compute_calculated_importance()
+            derived.add('calculated_importance')
+        if not adding and touched(self.IMPORTANCE_FIELDS):
+            self.importance_last_evaluated = now
+            derived.add('importance_last_evaluated')
+        if touched(['story_content']) and (not adding or self.has_story):
+            self.story_last_modified = now
+            derived.add('story_last_modified')
+        if touched(self.EVENT_DATE_FIELDS):
+            self.event_date = self.compute_event_date()
+            derived.add('event_date')
+        if touched(SEARCH_DOCUMENT_FIELDS):
+            self.search_document = build_search_document(self)
+            derived.add('search_document')
+        return derived
+    
+    def compute_calculated_importance(self):
+        """根据各维度分数计算综合重要度"""
         return round(
-            self.emotional_value * 0.35 + 
-            self.practical_value * 0.25 + 
-            self.frequency_of_use * 0.25 +
-            self.duration_owned * 0.15,
+            sum(getattr(self, field) * weight for field, weight in self.IMPORTANCE_WEIGHTS.items()),
             2
         )
     
+    def compute_event_date(self):
+        """事件日期：获得日期，其次认识日期，都没有时使用创建日期（新建条目为今天）"""
+        created_at = self.created_at or timezone.now()
+        return self.acquisition_date or self.meeting_date or created_at.astimezone(dt_timezone.utc).date()
+    
     @property
     def age_in_days(self):
         """计算条目年龄（天数）"""
-        if self.acquisition_date:
-            return (timezone.now().date() - self.acquisition_date).days
-        elif self.meeting_date:
-            return (timezone.now().date() - self.meeting_date).days
-        else:
-            return (timezone.now().date() - self.created_at.date()).days
+        event_date = self.event_date or self.compute_event_date()
+        return (timezone.now().date() - event_date).days
     
     @property
     def has_story(self):
@@ -192,6 +359,13 @@ class Entry(models.Model):
         """获取主要媒体文件"""
         return self.media_files.filter(is_primary=True).first()
     
+    def get_primary_image(self):
+        """获取主要图片，优先使用 with_primary_image() 预取的结果"""
+        primary_images = getattr(self, 'primary_images', None)
+        if primary_images is not None:
+            return primary_images[0] if primary_images else None
+        return self.media_files.filter(is_primary=True, type='image').first()
+    
     def clean(self):
         """模型验证"""
         from django.core.exceptions import ValidationError
@@ -209,6 +383,11 @@ class Entry(models.Model):
         # 验证获得日期
         if self.acquisition_date and self.acquisition_date > timezone.now().date():
             raise ValidationError({'acquisition_date': '获得日期不能是未来日期'})
+        
+        # 验证标签：超长的标签无法写入标签索引
+        errors = tag_errors(self.tags or [])
+        if errors:
+            raise ValidationError({'tags': errors})
 
 
 class EntryMedia(models.Model):
@@ -234,4 +413,80 @@ class EntryMedia(models.Model):
         ordering = ['-is_primary', '-created_at']
     
     def __str__(self):
-        return f"{self.entry.title} - {self.get_type_display()}"
\ No newline at end of file
+        return f"{self.entry.title} - {self.get_type_display()}"
+
+
+class EntryTag(models.Model):
+    """条目标签索引 - 与 Entry.tags 保持同步，用于按标签高效过滤"""
+    entry = models.ForeignKey(Entry, on_delete=models.CASCADE, related_name='tag_links')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='entry_tags')
+    tag = models.CharField(max_length=MAX_TAG_LENGTH)
+    
+    class Meta:
+        db_table = 'entry_tags'
+        verbose_name = '条目标签'
+        verbose_name_plural = '条目标签'
+        constraints = [
+            models.UniqueConstraint(fields=['entry', 'tag'], name='unique_entry_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'tag', 'entry']),
+        ]
+    
+    def __str__(self):
+        return f"{self.entry_id} - {self.tag}"
+
+
+class TagCount(models.Model):
+    """用户标签计数 - 随条目的创建、更新和删除增量维护"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tag_counts')
+    tag = models.CharField(max_length=MAX_TAG_LENGTH)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'entry_tag_counts'
+        verbose_name = '标签计数'
+        verbose_name_plural = '标签计数'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'tag'], name='unique_user_tag_count'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-count']),
+        ]
+    
+    def __str__(self):
+        return f"{self.tag} ({self.count})"
+
+
+class ImportanceSnapshot(models.Model):
+    """重要度快照 - 条目重要度字段新建或变化时追加一条，只增不改"""
+    entry = models.ForeignKey(Entry, on_delete=models.CASCADE, related_name='importance_snapshots')
+    recorded_at = models.DateTimeField(default=timezone.now)
+    importance_score = models.IntegerField()
+    emotional_value = models.IntegerField()
+    practical_value = models.IntegerField()
+    frequency_of_use = models.IntegerField()
+    duration_owned = models.IntegerField()
+    calculated_importance = models.FloatField()
+    
+    class Meta:
+        db_table = 'entry_importance_snapshots'
+        verbose_name = '重要度快照'
+        verbose_name_plural = '重要度快照'
+        ordering = ['recorded_at', 'id']
+        indexes = [
+            models.Index(fields=['entry', 'recorded_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.entry_id} @ {self.recorded_at:%Y-%m-%d %H:%M}: {self.calculated_importance}"
+    
+    @classmethod
+    def from_entry(cls, entry, recorded_at=None):
+        """由条目当前的重要度字段构造快照（不写数据库）"""
+        return cls(
+            entry=entry,
+            recorded_at=recorded_at or timezone.now(),
+            calculated_importance=entry.calculated_importance,
+            **{field: getattr(entry, field) for field in Entry.IMPORTANCE_FIELDS},
+        )
@@ -0,0 +1,173 @@
+"""
+条目列表的键集（游标）分页
+
+按 (排序字段, id) 定位下一页，沿用 (user, updated_at) / (user, created_at) /
+(user, importance_score) / (user, event_date) 索引，不需要 COUNT(*) 和 OFFSET，第N页与第一页开销相同。
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import Entry
+
+
+def entry_value(entry, name):
+    """读取条目实例或 values() 行的字段值"""
+    if isinstance(entry, dict):
+        return entry[name]
+    return getattr(entry, name)
+
+
+class EntryPageNumberPagination(PageNumberPagination):
+    """页码分页，可复用条件请求时已经统计的条目数，避免重复执行 COUNT"""
+    known_count = None
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = Paginator(object_list, per_page)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
+
+
+class EntryCursorPagination(BasePagination):
+    """条目键集分页，客户端通过 ?pagination=cursor 或携带 cursor 参数启用"""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    page_size = api_settings.PAGE_SIZE or 20
+    ordering_param = 'ordering'
+
+    # 可用于键集分页的排序字段（均有 (user, 字段) 复合索引）
+    ordering_fields = ['updated_at', 'created_at', 'importance_score', 'event_date']
+    default_ordering = '-updated_at'
+    invalid_cursor_message = '无效的游标'
+
+    @classmethod
+    def is_requested(cls, request):
+        """判断请求是否选择了游标分页"""
+        return (
+            request.query_params.get('pagination') == 'cursor'
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+        # 向前翻页时反向查询，取到结果后再倒序
+        descending = self.descending != reverse
+
+        order = [f'-{self.field}', '-id'] if descending else [self.field, 'id']
+        queryset = queryset.order_by(*order)
+        if cursor:
+            queryset = queryset.filter(self.position_filter(cursor['value'], cursor['id'], descending))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        if reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        """返回 (排序字段, 是否降序)，不支持的字段使用默认排序"""
+        ordering = request.query_params.get(self.ordering_param, '').split(',')[0].strip()
+        if ordering.lstrip('-') not in self.ordering_fields:
+            ordering = self.default_ordering
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def position_filter(self, value, pk, descending):
+        """(字段, id) 严格位于游标之后的条件"""
+        if descending:
+            return Q(**{f'{self.field}__lt': value}) | Q(**{self.field: value, 'id__lt': pk})
+        return Q(**{f'{self.field}__gt': value}) | Q(**{self.field: value, 'id__gt': pk})
+
+    def encode_cursor(self, entry, reverse):
+        value = entry_value(entry, self.field)
+        if isinstance(value, date):
+            value = value.isoformat()
+        payload = json.dumps({'v': value, 'id': entry_value(entry, 'id'), 'r': int(reverse)}, separators=(',', ':'))
+        return urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(urlsafe_b64decode(padded.encode()))
+            # 按排序字段的类型转换并校验游标值，类型不符的游标在这里拒绝，不会在查询时出错
+            field = Entry._meta.get_field(self.field)
+            value = field.to_python(payload['v'])
+            if value is None:
+                raise ValueError
+            field.run_validators(value)
+            pk = Entry._meta.pk.to_python(payload['id'])
+            if pk is None:
+                raise ValueError
+            Entry._meta.pk.run_validators(pk)
+            return {'value': value, 'id': pk, 'reverse': bool(payload.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_link(self, entry, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(entry, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.get_link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,157 @@
+"""
+条目全文搜索
+
+每个条目维护一份分词后的搜索文档（Entry.search_document）：中日韩文字按字符二元组切分，
+其他文字按单词小写切分。PostgreSQL 使用 tsvector 表达式上的 GIN 索引，SQLite 使用
+FTS5 虚拟表，其他数据库退回到 SearchFilter 的 ICONTAINS 搜索。
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+from rest_framework import filters
+
+# 参与搜索的条目字段
+SEARCH_DOCUMENT_FIELDS = ['title', 'description', 'story_content', 'tags']
+
+# SQLite FTS5 虚拟表名
+SQLITE_FTS_TABLE = 'entries_fts'
+
+# PostgreSQL 全文搜索配置：文档已预先分词，使用不做词干处理的 simple 配置
+POSTGRES_SEARCH_CONFIG = 'simple'
+
+_WORD_RE = re.compile(r'[^\W_]+')
+_CJK_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+
+
+def _cjk_tokens(run):
+    """中日韩文字按字符二元组切分，单字保留原样"""
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text):
+    """把文本切分为搜索词元"""
+    tokens = []
+    for word in _WORD_RE.findall(text or ''):
+        position = 0
+        for match in _CJK_RE.finditer(word):
+            if match.start() > position:
+                tokens.append(word[position:match.start()].lower())
+            tokens.extend(_cjk_tokens(match.group()))
+            position = match.end()
+        if position < len(word):
+            tokens.append(word[position:].lower())
+    return tokens
+
+
+def build_search_document(entry):
+    """根据条目内容生成搜索文档"""
+    parts = [
+        entry.title,
+        entry.description,
+        strip_tags(entry.story_content or ''),
+        ' '.join(str(tag) for tag in entry.tags or []),
+    ]
+    return ' '.join(tokenize(' '.join(part for part in parts if part)))
+
+
+def _query_terms(query):
+    """把搜索字符串切分为去重后的查询词元，保持原有顺序"""
+    return list(dict.fromkeys(tokenize(query)))
+
+
+def _is_prefix_term(term):
+    """单个中日韩字符在文档中只会出现在二元组开头，按前缀匹配"""
+    return len(term) == 1 and bool(_CJK_RE.match(term))
+
+
+def _postgres_search(queryset, terms):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    tsquery = ' & '.join(
+        f"'{term}':*" if _is_prefix_term(term) else f"'{term}'" for term in terms
+    )
+    vector = SearchVector('search_document', config=POSTGRES_SEARCH_CONFIG)
+    search_query = SearchQuery(tsquery, config=POSTGRES_SEARCH_CONFIG, search_type='raw')
+    return (
+        queryset.annotate(search_vector=vector)
+        .filter(search_vector=search_query)
+        .annotate(search_rank=SearchRank(F('search_vector'), search_query))
+    )
+
+
+def _sqlite_search(queryset, terms):
+    match = ' '.join(f'"{term}"*' if _is_prefix_term(term) else f'"{term}"' for term in terms)
+    table = queryset.model._meta.db_table
+    return queryset.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s', [match])
+    ).annotate(
+        # FTS5 的 rank 是 bm25 的负值，越小越相关
+        search_rank=RawSQL(
+            f'SELECT -rank FROM {SQLITE_FTS_TABLE} '
+            f'WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [match],
+            output_field=FloatField(),
+        )
+    )
+
+
+def search_entries(queryset, query):
+    """
+    全文搜索条目，返回带 search_rank 注解的查询集
+
+    不支持全文索引的数据库，或查询中没有可索引的词元（例如只有标点）时返回 None，
+    由调用方退回到普通搜索。
+    """
+    terms = _query_terms(query)
+    if not terms:
+        return None
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, terms)
+    if connection.vendor == 'sqlite':
+        return _sqlite_search(queryset, terms)
+    return None
+
+
+def index_entries(entries):
+    """把条目的搜索文档写入 SQLite FTS5 表；PostgreSQL 使用表达式索引，无需维护"""
+    if connection.vendor != 'sqlite':
+        return
+    rows = [(entry.pk, entry.search_document) for entry in entries]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', [(pk,) for pk, _ in rows])
+        cursor.executemany(f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_document) VALUES (%s, %s)', rows)
+
+
+def unindex_entries(entry_ids):
+    """从 SQLite FTS5 表删除条目"""
+    if connection.vendor != 'sqlite' or not entry_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in entry_ids])
+
+
+class EntrySearchFilter(filters.SearchFilter):
+    """
+    基于全文索引的搜索过滤器
+
+    应放在 OrderingFilter 之后：未显式指定 ordering 参数时按相关度排序。
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+
+        results = search_entries(queryset, query)
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        if request.query_params.get('ordering'):
+            return results
+        return results.order_by('-search_rank', *results.query.order_by)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import Entry, EntryMedia
+from .models import Entry, EntryMedia, ImportanceSnapshot, tag_errors
+from .fieldsets import SparseFieldsMixin
 
 
 class EntryMediaSerializer(serializers.ModelSerializer):
@@ -22,13 +23,21 @@ class EntryMediaSerializer(serializers.ModelSerializer):
         return None
 
 
-class EntrySerializer(serializers.ModelSerializer):
-    """条目详情序列化器"""
+class EntrySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """条目详情序列化器，支持 ?fields= / ?exclude= 选择字段"""
     media_files = EntryMediaSerializer(many=True, read_only=True)
     calculated_importance = serializers.ReadOnlyField()
     age_in_days = serializers.ReadOnlyField()
     has_story = serializers.ReadOnlyField()
     
+    column_dependencies = {
+        'age_in_days': ['event_date'],
+        'has_story': ['story_content'],
+    }
+    prefetch_dependencies = {
+        'media_files': lambda queryset: queryset.prefetch_related('media_files'),
+    }
+    
     class Meta:
         model = Entry
         fields = [
@@ -45,6 +54,13 @@ class EntrySerializer(serializers.ModelSerializer):
             'story_last_modified', 'importance_last_evaluated', 'created_at', 'updated_at'
         ]
     
+    def validate_tags(self, value):
+        """验证标签列表"""
+        errors = tag_errors(value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+    
     def validate(self, data):
         """验证数据"""
         entry_type = data.get('type')
@@ -79,24 +95,6 @@ class EntrySerializer(serializers.ModelSerializer):
         """创建条目"""
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
-    
-    def update(self, instance, validated_data):
-        """更新条目"""
-        # 检查重要度字段是否有变化
-        importance_fields = ['importance_score', 'emotional_value', 'practical_value', 'frequency_of_use', 'duration_owned']
-        importance_changed = any(
-            field in validated_data and getattr(instance, field) != validated_data[field]
-            for field in importance_fields
-        )
-        
-        # 更新实例
-        instance = super().update(instance, validated_data)
-        
-        # 如果重要度有变化，更新评估时间
-        if importance_changed:
-            instance.update_importance_evaluation()
-        
-        return instance
 
 
 class EntryListSerializer(serializers.ModelSerializer):
@@ -113,7 +111,7 @@ class EntryListSerializer(serializers.ModelSerializer):
     
     def get_primary_image(self, obj):
         """获取主要图片"""
-        primary_media = obj.media_files.filter(is_primary=True, type='image').first()
+        primary_media = obj.get_primary_image()
         if primary_media:
             return self.context['request'].build_absolute_uri(primary_media.file.url)
         return None
@@ -149,12 +147,23 @@ class EntryCreateUpdateSerializer(serializers.ModelSerializer):
         return super().validate(data)
 
 
-class EntryListSerializer(serializers.ModelSerializer):
-    """条目列表序列化器 - 用于列表显示，减少数据量"""
+class EntryListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """条目列表序列化器 - 用于列表显示，减少数据量，支持 ?expand=media_files 展开全部媒体文件"""
     primary_image = serializers.SerializerMethodField()
     calculated_importance = serializers.ReadOnlyField()
     has_story = serializers.ReadOnlyField()
     
+    expandable_fields = {
+        'media_files': lambda: EntryMediaSerializer(many=True, read_only=True),
+    }
+    column_dependencies = {
+        'has_story': ['story_content'],
+    }
+    prefetch_dependencies = {
+        'primary_image': lambda queryset: queryset.with_primary_image(),
+        'media_files': lambda queryset: queryset.prefetch_related('media_files'),
+    }
+    
     class Meta:
         model = Entry
         fields = [
@@ -165,7 +174,7 @@ class EntryListSerializer(serializers.ModelSerializer):
     
     def get_primary_image(self, obj):
         """获取主要图片"""
-        primary_media = obj.media_files.filter(is_primary=True, type='image').first()
+        primary_media = obj.get_primary_image()
         if primary_media:
             request = self.context.get('request')
             if request:
@@ -187,6 +196,13 @@ class EntryCreateUpdateSerializer(serializers.ModelSerializer):
             'duration_owned', 'theme', 'decorations', 'layout', 'tags', 'is_private'
         ]
     
+    def validate_tags(self, value):
+        """验证标签列表"""
+        errors = tag_errors(value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+    
     def validate(self, data):
         """验证数据"""
         entry_type = data.get('type')
@@ -232,22 +248,13 @@ class EntryCreateUpdateSerializer(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         """更新条目"""
-        # 检查重要度字段是否有变化
-        importance_fields = ['importance_score', 'emotional_value', 'practical_value', 'frequency_of_use', 'duration_owned']
-        importance_changed = any(
-            field in validated_data and getattr(instance, field) != validated_data[field]
-            for field in importance_fields
-        )
-        
         # 更新字段
         for field, value in validated_data.items():
             setattr(instance, field, value)
         
-        instance.save()
-        
-        # 如果重要度有变化，更新评估时间
-        if importance_changed:
-            instance.update_importance_evaluation()
+        # Entry.save 只写入变化的列，并在同一次 UPDATE 中更新重要度评估时间和故事修改时间；
+        # 请求没有修改任何字段时不写数据库，updated_at 和响应缓存保持不变
+        instance.save(skip_unchanged=True)
         
         return instance
 
@@ -262,13 +269,20 @@ class StoryContentSerializer(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         """更新故事内容"""
-        old_content = instance.story_content
-        new_content = validated_data.get('story_content', '')
-        
-        # 如果内容有变化，更新修改时间
-        if old_content != new_content:
-            instance.story_content = new_content
-            instance.story_last_modified = timezone.now()
-            instance.save(update_fields=['story_content', 'story_last_modified'])
+        # 内容有变化时 Entry.save 会同时更新修改时间，没有变化则不写数据库
+        instance.story_content = validated_data.get('story_content', '')
+        instance.save(skip_unchanged=True)
         
-        return instance
\ No newline at end of file
+        return instance
+
+
+class ImportanceSnapshotSerializer(serializers.ModelSerializer):
+    """重要度快照序列化器 - 用于重要度历史时间序列"""
+    
+    class Meta:
+        model = ImportanceSnapshot
+        fields = [
+            'recorded_at', 'importance_score', 'emotional_value', 'practical_value',
+            'frequency_of_use', 'duration_owned', 'calculated_importance'
+        ]
+        read_only_fields = fields
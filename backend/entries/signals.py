@@ -0,0 +1,110 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_generation
+from .models import Entry, EntryMedia
+from .search import index_entries, unindex_entries
+from .tagging import apply_tag_deltas, sync_entry_tags, tag_deltas
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_write():
+    """批量写入期间跳过逐行的索引维护，由调用方统一处理"""
+    previous = getattr(_state, 'bulk', False)
+    _state.bulk = True
+    try:
+        yield
+    finally:
+        _state.bulk = previous
+
+
+def _in_bulk_write():
+    return getattr(_state, 'bulk', False)
+
+
+@receiver(post_save, sender=Entry)
+def update_tags_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """条目保存后按标签差异更新标签索引和计数"""
+    if raw or _in_bulk_write():
+        return
+    if update_fields is not None and 'tags' not in update_fields:
+        return
+    # post_save 在 Entry.save 刷新原值记录之前发送，这里拿到的是保存前的标签
+    old_tags = [] if created else instance.get_loaded_value('tags', [])
+    sync_entry_tags(instance, old_tags, instance.tags)
+    apply_tag_deltas(instance.user_id, tag_deltas(old_tags, instance.tags))
+
+
+@receiver(post_delete, sender=Entry)
+def update_tag_counts_on_delete(sender, instance, **kwargs):
+    """条目删除后扣减标签计数（EntryTag 行随条目级联删除）"""
+    if _in_bulk_write():
+        return
+    old_tags = instance.get_loaded_value('tags', instance.tags)
+    apply_tag_deltas(instance.user_id, tag_deltas(old_tags, []))
+
+
+@receiver(post_save, sender=Entry)
+def update_search_index_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """条目保存后同步全文搜索索引"""
+    if raw or _in_bulk_write():
+        return
+    if update_fields is not None and 'search_document' not in update_fields:
+        return
+    index_entries([instance])
+
+
+@receiver(post_delete, sender=Entry)
+def update_search_index_on_delete(sender, instance, **kwargs):
+    """条目删除后从全文搜索索引移除"""
+    if _in_bulk_write():
+        return
+    unindex_entries([instance.pk])
+
+
+def _deleted_with_entry(origin):
+    """删除是否由条目删除级联触发（条目删除时会单独处理）"""
+    return isinstance(origin, Entry) or getattr(origin, 'model', None) is Entry
+
+
+def _entry_owner(instance):
+    """关联对象所属条目的用户id，优先使用已加载的条目"""
+    entry = instance._state.fields_cache.get('entry')
+    if entry is not None:
+        return entry.user_id
+    return Entry.objects.filter(pk=instance.entry_id).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=EntryMedia)
+@receiver(post_delete, sender=EntryMedia)
+def touch_entry_on_media_change(sender, instance, raw=False, origin=None, **kwargs):
+    """媒体文件变化时更新条目的 updated_at，使条目的 ETag / Last-Modified 失效"""
+    if raw or _in_bulk_write() or _deleted_with_entry(origin):
+        return
+    Entry.objects.filter(pk=instance.entry_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Entry)
+@receiver(post_delete, sender=Entry)
+def invalidate_cache_on_entry_change(sender, instance, **kwargs):
+    """条目变化时使用户的响应缓存失效"""
+    if _in_bulk_write():
+        return
+    bump_generation(instance.user_id)
+
+
+@receiver(post_save, sender=EntryMedia)
+@receiver(post_delete, sender=EntryMedia)
+@receiver(post_save, sender='valuations.ValuationRecord')
+@receiver(post_delete, sender='valuations.ValuationRecord')
+def invalidate_cache_on_related_change(sender, instance, origin=None, **kwargs):
+    """媒体文件或估值记录变化时使所属用户的响应缓存失效"""
+    if _in_bulk_write() or _deleted_with_entry(origin):
+        return
+    bump_generation(_entry_owner(instance))
@@ -0,0 +1,156 @@
+"""
+标签索引和计数维护
+
+条目的标签变化以增量形式同步到 EntryTag 索引表和 TagCount 计数表：
+按标签过滤走 EntryTag 上的 (user, tag, entry) 索引，统计接口直接读取计数表，
+都不再扫描用户的全部条目。
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Entry, EntryTag, TagCount
+
+
+def tag_deltas(old_tags, new_tags):
+    """计算新旧标签列表之间每个标签的计数变化"""
+    old_counts = Counter(old_tags or [])
+    new_counts = Counter(new_tags or [])
+    deltas = {}
+    for tag in old_counts.keys() | new_counts.keys():
+        delta = new_counts[tag] - old_counts[tag]
+        if delta:
+            deltas[tag] = delta
+    return deltas
+
+
+def apply_tag_deltas(user_id, deltas):
+    """使用 F() 原子增减用户的标签计数"""
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        emptied = []
+        for tag, delta in deltas.items():
+            updated = TagCount.objects.filter(user_id=user_id, tag=tag).update(count=F('count') + delta)
+            if delta < 0:
+                emptied.append(tag)
+            elif not updated:
+                _create_tag_count(user_id, tag, delta)
+
+        if emptied:
+            TagCount.objects.filter(user_id=user_id, tag__in=emptied, count__lte=0).delete()
+
+
+def _create_tag_count(user_id, tag, count):
+    """创建新的标签计数行，处理并发创建的情况"""
+    try:
+        with transaction.atomic():
+            TagCount.objects.create(user_id=user_id, tag=tag, count=count)
+    except IntegrityError:
+        # 并发请求已经创建了这一行
+        TagCount.objects.filter(user_id=user_id, tag=tag).update(count=F('count') + count)
+
+
+def sync_entry_tags(entry, old_tags, new_tags):
+    """按新旧标签差异同步条目的 EntryTag 索引行"""
+    old_set = set(old_tags or [])
+    new_set = set(new_tags or [])
+    removed = old_set - new_set
+    added = new_set - old_set
+    if removed:
+        EntryTag.objects.filter(entry=entry, tag__in=removed).delete()
+    if added:
+        EntryTag.objects.bulk_create(
+            [EntryTag(entry=entry, user_id=entry.user_id, tag=tag) for tag in added],
+            ignore_conflicts=True
+        )
+
+
+def sync_tags_bulk(changes):
+    """
+    批量同步标签索引和计数
+
+    changes 为 (entry, old_tags, new_tags) 列表，用于绕过 Entry.save 的批量写入。
+    """
+    changes = [(entry, old, new) for entry, old, new in changes if tag_deltas(old, new)]
+    if not changes:
+        return
+
+    EntryTag.objects.filter(entry__in=[entry.pk for entry, old, _ in changes if old]).delete()
+    EntryTag.objects.bulk_create(
+        [
+            EntryTag(entry=entry, user_id=entry.user_id, tag=tag)
+            for entry, _, new in changes
+            for tag in set(new or [])
+        ],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+    deltas_by_user = {}
+    for entry, old, new in changes:
+        user_deltas = deltas_by_user.setdefault(entry.user_id, Counter())
+        user_deltas.update(tag_deltas(old, new))
+    for user_id, deltas in deltas_by_user.items():
+        apply_tag_deltas(user_id, {tag: delta for tag, delta in deltas.items() if delta})
+
+
+def filter_by_tags(queryset, user, all_tags=None, any_tags=None, exclude_tags=None):
+    """
+    按标签过滤条目
+
+    all_tags: 必须同时包含的标签（AND）
+    any_tags: 至少包含其中一个的标签（OR）
+    exclude_tags: 不能包含的标签（NOT）
+    """
+    links = EntryTag.objects.filter(user=user)
+    if all_tags:
+        all_tags = set(all_tags)
+        matching = (
+            links.filter(tag__in=all_tags)
+            .values('entry')
+            .annotate(matched=Count('tag'))
+            .filter(matched=len(all_tags))
+            .values('entry')
+        )
+        queryset = queryset.filter(id__in=matching)
+    if any_tags:
+        queryset = queryset.filter(id__in=links.filter(tag__in=set(any_tags)).values('entry'))
+    if exclude_tags:
+        queryset = queryset.exclude(id__in=links.filter(tag__in=set(exclude_tags)).values('entry'))
+    return queryset
+
+
+def top_tags(user, limit=20):
+    """读取用户最常用的标签"""
+    return list(
+        TagCount.objects.filter(user=user, count__gt=0)
+        .order_by('-count', 'tag')
+        .values_list('tag', 'count')[:limit]
+    )
+
+
+def rebuild_tag_counts(users=None):
+    """根据条目数据重建标签计数表，返回写入的行数"""
+    entries = Entry.objects.order_by()
+    tag_counts = TagCount.objects.all()
+    if users is not None:
+        entries = entries.filter(user__in=users)
+        tag_counts = tag_counts.filter(user__in=users)
+
+    per_user = {}
+    for user_id, tags in entries.values_list('user_id', 'tags').iterator(chunk_size=2000):
+        per_user.setdefault(user_id, Counter()).update(tags or [])
+
+    rows = [
+        TagCount(user_id=user_id, tag=tag, count=count)
+        for user_id, counts in per_user.items()
+        for tag, count in counts.items()
+        if count > 0
+    ]
+    with transaction.atomic():
+        tag_counts.delete()
+        TagCount.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
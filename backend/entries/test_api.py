@@ -1,14 +1,26 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
 from datetime import date, timedelta
-from .models import Entry, EntryMedia
+from base64 import urlsafe_b64encode
+import json
+import time
+from django.utils.http import http_date
+from .models import Entry, EntryMedia, TagCount
 
 User = get_user_model()
 
+# 依赖响应缓存的测试使用进程内缓存，不受运行配置（例如开发环境的 DummyCache）影响
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'entries': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'entries-test'},
+}
+
 
 class EntryAPITest(TestCase):
     """条目API测试"""
@@ -257,6 +269,16 @@ class EntryAPITest(TestCase):
         self.assertEqual(self.item_entry.story_content, '这是一个有趣的故事...')
         self.assertIsNotNone(self.item_entry.story_last_modified)
         self.assertTrue(self.item_entry.has_story)
+        
+        # 内容没有变化时不写数据库，updated_at 保持不变
+        updated_at = self.item_entry.updated_at
+        for method in [self.client.patch, self.client.put]:
+            with CaptureQueriesContext(connection) as queries:
+                response = method(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse([query for query in queries.captured_queries if query['sql'].startswith('UPDATE')])
+        self.item_entry.refresh_from_db()
+        self.assertEqual(self.item_entry.updated_at, updated_at)
     
     def test_filtering_and_search(self):
         """测试过滤和搜索"""
@@ -356,6 +378,17 @@ class EntryAPITest(TestCase):
             'date_to': date_to
         })
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry['id'] for entry in response.data['results']], [self.item_entry.id])
+        
+        # 没有获得日期和认识日期的条目按创建日期匹配
+        undated = Entry.objects.create(user=self.user1, type='item', title='未填日期的物品')
+        response = self.client.get(url, {'date_from': date_from, 'ordering': '-event_date'})
+        self.assertEqual([entry['id'] for entry in response.data['results']], [undated.id, self.item_entry.id])
+        
+        response = self.client.get(url, {'pagination': 'cursor', 'ordering': 'event_date', 'page_size': 1})
+        self.assertEqual([entry['id'] for entry in response.data['results']], [self.person_entry.id])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([entry['id'] for entry in response.data['results']], [self.item_entry.id])
         
         # 按价格范围搜索
         response = self.client.get(url, {
@@ -363,4 +396,575 @@ class EntryAPITest(TestCase):
             'price_max': '1500'
         })
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['results']), 1)  # 应该找到测试物品
\ No newline at end of file
+        self.assertEqual(len(response.data['results']), 1)  # 应该找到测试物品
+    
+    def test_list_primary_image_query_count(self):
+        """测试列表页主要图片的查询次数固定"""
+        self.client.force_authenticate(user=self.user1)
+        for i in range(20):
+            entry = Entry.objects.create(user=self.user1, type='item', title=f'物品{i}')
+            EntryMedia.objects.create(entry=entry, type='image', file=f'primary{i}.jpg', is_primary=True)
+            for j in range(3):
+                EntryMedia.objects.create(entry=entry, type='image', file=f'other{i}_{j}.jpg')
+        
+        url = reverse('entry-list')
+        # MAX(updated_at) 与 COUNT 聚合 + 当前页条目 + 主要图片预取
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 20)
+        for entry_data in response.data['results']:
+            self.assertIn('/media/primary', entry_data['primary_image'])
+    
+    def test_by_importance_ordering(self):
+        """测试按综合重要度在数据库中排序"""
+        self.client.force_authenticate(user=self.user1)
+        Entry.objects.create(
+            user=self.user1, type='item', title='高重要度',
+            emotional_value=10, practical_value=9, frequency_of_use=9, duration_owned=8
+        )
+        Entry.objects.create(
+            user=self.user1, type='item', title='低重要度',
+            emotional_value=1, practical_value=2, frequency_of_use=1, duration_owned=1
+        )
+        
+        response = self.client.get(reverse('entry-by-importance'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [entry['title'] for entry in response.data['results']]
+        self.assertEqual(titles[0], '高重要度')
+        self.assertEqual(titles[-1], '低重要度')
+        
+        # OrderingFilter 也可以直接使用综合重要度排序
+        response = self.client.get(reverse('entry-list'), {'ordering': 'calculated_importance'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        scores = [entry['calculated_importance'] for entry in response.data['results']]
+        self.assertEqual(scores, sorted(scores))
+    
+    def test_statistics_query_budget(self):
+        """测试统计信息的查询次数与集合大小无关"""
+        self.client.force_authenticate(user=self.user1)
+        for i in range(30):
+            Entry.objects.create(
+                user=self.user1, type='item', title=f'物品{i}', category=f'类别{i % 3}',
+                importance_score=i % 10 + 1, tags=['批量', f'标签{i % 2}'],
+                story_content='故事' if i % 2 else ''
+            )
+        
+        url = reverse('entry-statistics')
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_count'], 32)
+        self.assertEqual(response.data['item_count'], 31)
+        self.assertEqual(response.data['person_count'], 1)
+        self.assertEqual(response.data['with_story_count'], 15)
+        self.assertEqual(response.data['without_story_count'], 17)
+        self.assertEqual(response.data['importance_distribution']['8'], 4)
+        self.assertEqual(response.data['categories'], ['电子产品', '类别0', '类别1', '类别2'])
+        self.assertEqual(response.data['relationships'], ['friend'])
+        self.assertEqual(response.data['tags'][0], ('批量', 30))
+        
+        # 无法识别的过滤参数不会过滤条目，标签统计仍读取计数表
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'has_story': 'maybe', 'min_importance': 'x'})
+        self.assertEqual(response.data['total_count'], 32)
+        self.assertEqual(response.data['tags'][0], ('批量', 30))
+        
+        response = self.client.get(url, {'has_story': 'true'})
+        self.assertEqual(response.data['total_count'], 15)
+        self.assertEqual(response.data['tags'][0], ('批量', 15))
+    
+    def test_by_type_query_budget(self):
+        """测试按类型分组的查询次数固定，每个类型返回最近更新的 5 个条目"""
+        self.client.force_authenticate(user=self.user1)
+        for i in range(8):
+            entry = Entry.objects.create(user=self.user1, type='item', title=f'物品{i}', category=f'类别{i % 3}')
+            EntryMedia.objects.create(entry=entry, type='image', file=f'primary{i}.jpg', is_primary=True)
+            Entry.objects.create(user=self.user1, type='person', title=f'人物{i}', relationship='family')
+        
+        # 计数和分面 + 窗口函数 top 5 + 主要图片
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('entry-by-type'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items, persons = response.data['items'], response.data['persons']
+        self.assertEqual(items['count'], 9)
+        self.assertEqual(items['categories'], ['电子产品', '类别0', '类别1', '类别2'])
+        self.assertEqual(persons['count'], 9)
+        self.assertEqual(persons['relationships'], ['family', 'friend'])
+        
+        for group, entry_type in [(items, 'item'), (persons, 'person')]:
+            expected = Entry.objects.filter(user=self.user1, type=entry_type).order_by('-updated_at', '-id')[:5]
+            self.assertEqual([entry['id'] for entry in group['recent']], [entry.id for entry in expected])
+        self.assertIn('/media/primary7', items['recent'][0]['primary_image'])
+    
+    def test_timeline(self):
+        """测试时间线按事件日期汇总，多年数据一次查询完成"""
+        self.client.force_authenticate(user=self.user2)
+        Entry.objects.create(
+            user=self.user2, type='item', title='相机', acquisition_date=date(2021, 3, 5),
+            original_price=Decimal('1000.50'), importance_score=8, tags=['摄影']
+        )
+        Entry.objects.create(
+            user=self.user2, type='item', title='镜头', acquisition_date=date(2021, 3, 20),
+            original_price=Decimal('200.00'), currency='USD', importance_score=5
+        )
+        Entry.objects.create(
+            user=self.user2, type='person', title='李四', meeting_date=date(2022, 7, 1), importance_score=6
+        )
+        
+        url = reverse('entry-timeline')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        this_month = Entry.objects.get(pk=self.other_user_entry.pk).event_date.replace(day=1).isoformat()
+        self.assertEqual(response.data, {'interval': 'month', 'buckets': [
+            {'period': '2021-03-01', 'count': 2, 'average_importance': 6.5,
+             'total_original_price': {'CNY': '1000.50', 'USD': '200.00'}},
+            {'period': '2022-07-01', 'count': 1, 'average_importance': 6.0, 'total_original_price': {}},
+            {'period': this_month, 'count': 1, 'average_importance': 5.0, 'total_original_price': {}},
+        ]})
+        
+        response = self.client.get(url, {'interval': 'year', 'type': 'person'})
+        self.assertEqual(response.data['buckets'], [
+            {'period': '2022-01-01', 'count': 1, 'average_importance': 6.0, 'total_original_price': {}},
+        ])
+        response = self.client.get(url, {'interval': 'year', 'tags': '摄影'})
+        self.assertEqual([bucket['count'] for bucket in response.data['buckets']], [1])
+        
+        response = self.client.get(url, {'interval': 'week'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_importance_history(self):
+        """测试重要度历史按上限降采样"""
+        from django.utils import timezone
+        from .models import ImportanceSnapshot
+        
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('entry-importance-history', kwargs={'pk': self.item_entry.pk})
+        start = timezone.now()
+        # 替换创建条目时写入的快照
+        self.item_entry.importance_snapshots.all().delete()
+        ImportanceSnapshot.objects.bulk_create([
+            ImportanceSnapshot(
+                entry=self.item_entry, recorded_at=start + timedelta(hours=i), importance_score=8,
+                emotional_value=i % 10 + 1, practical_value=5, frequency_of_use=5, duration_owned=5,
+                calculated_importance=float(i % 10)
+            )
+            for i in range(600)
+        ])
+        
+        # 条目、降采样用的两列和保留的快照行各一条查询
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'points': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 600)
+        points = response.data['points']
+        self.assertEqual(len(points), 50)
+        self.assertEqual((points[0]['emotional_value'], points[-1]['emotional_value']), (1, 10))
+        self.assertEqual(points[-1]['calculated_importance'], 9.0)
+        
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['points']), 200)
+        
+        for invalid in ['2', 'abc', '5000']:
+            response = self.client.get(url, {'points': invalid})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        # 不能读取其他用户条目的历史
+        response = self.client.get(reverse('entry-importance-history', kwargs={'pk': self.other_user_entry.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_tag_filtering(self):
+        """测试标签的 AND/OR/NOT 过滤"""
+        self.client.force_authenticate(user=self.user1)
+        Entry.objects.create(user=self.user1, type='item', title='工作电脑', tags=['工作', '电子产品'])
+        Entry.objects.create(user=self.user1, type='item', title='游戏机', tags=['娱乐', '电子产品'])
+        Entry.objects.create(user=self.user1, type='item', title='笔记本', tags=['工作'])
+        Entry.objects.create(user=self.user2, type='item', title='其他人的电脑', tags=['工作', '电子产品'])
+        url = reverse('entry-list')
+        
+        def titles(params):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return sorted(entry['title'] for entry in response.data['results'])
+        
+        self.assertEqual(titles({'tags': '工作,电子产品'}), ['工作电脑'])
+        self.assertEqual(titles({'tags_any': '工作,娱乐'}), ['工作电脑', '游戏机', '笔记本'])
+        self.assertEqual(titles({'tags': '电子产品', 'tags_exclude': '娱乐'}), ['工作电脑'])
+        
+        # 超长标签在写入前被拒绝
+        response = self.client.post(url, {
+            'type': 'person', 'title': '张三', 'relationship': '朋友', 'tags': ['x' * 256]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', response.data)
+    
+    def test_full_text_search(self):
+        """测试全文搜索支持中文分词并按相关度排序"""
+        self.client.force_authenticate(user=self.user1)
+        Entry.objects.create(
+            user=self.user1, type='item', title='外婆的怀表',
+            story_content='<p>这块怀表是外婆留给我的，怀表背面刻着她的名字。</p>'
+        )
+        Entry.objects.create(
+            user=self.user1, type='item', title='旧相机',
+            story_content='第一次旅行时带着它，也拍过外婆的怀表。'
+        )
+        Entry.objects.create(user=self.user1, type='item', title='Vintage Camera', tags=['Travel'])
+        url = reverse('entry-list')
+        
+        response = self.client.get(url, {'search': '怀表'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [entry['title'] for entry in response.data['results']]
+        self.assertEqual(titles, ['外婆的怀表', '旧相机'])
+        
+        response = self.client.get(url, {'search': '外婆 旅行'})
+        self.assertEqual([entry['title'] for entry in response.data['results']], ['旧相机'])
+        
+        response = self.client.get(url, {'search': 'travel'})
+        self.assertEqual([entry['title'] for entry in response.data['results']], ['Vintage Camera'])
+        
+        # 没有可索引词元的查询退回到普通搜索，不会匹配所有条目
+        response = self.client.get(url, {'search': '!!!'})
+        self.assertEqual(response.data['results'], [])
+        
+        # 修改后搜索索引同步更新
+        camera = Entry.objects.get(title='Vintage Camera')
+        camera.title = '复古相机'
+        camera.save()
+        response = self.client.get(url, {'search': '相机'})
+        self.assertEqual(
+            sorted(entry['title'] for entry in response.data['results']), ['复古相机', '旧相机']
+        )
+    
+    def test_cursor_pagination(self):
+        """测试键集分页遍历全部条目且不执行 COUNT"""
+        self.client.force_authenticate(user=self.user1)
+        for i in range(45):
+            Entry.objects.create(user=self.user1, type='item', title=f'物品{i}', importance_score=i % 3 + 1)
+        url = reverse('entry-list')
+        
+        seen = []
+        params = {'pagination': 'cursor', 'ordering': '-importance_score'}
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(entry['id'] for entry in response.data['results'])
+            if not response.data['next']:
+                break
+            # 条目 + 主要图片预取，没有 COUNT 查询
+            with self.assertNumQueries(2):
+                response = self.client.get(response.data['next'])
+        
+        self.assertEqual(len(seen), 47)
+        self.assertEqual(len(set(seen)), 47)
+        scores = list(Entry.objects.filter(id__in=seen).values_list('id', 'importance_score'))
+        score_by_id = dict(scores)
+        self.assertEqual([score_by_id[pk] for pk in seen], sorted(score_by_id.values(), reverse=True))
+        
+        # 从最后一页向前翻页
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([entry['id'] for entry in response.data['results']], seen[20:40])
+        
+        # 游标值与排序字段类型不符时返回 404
+        for ordering, value in [('-importance_score', 'abc'), ('-updated_at', 5), ('event_date', [1])]:
+            payload = json.dumps({'v': value, 'id': 1}).encode()
+            cursor = urlsafe_b64encode(payload).decode().rstrip('=')
+            response = self.client.get(url, {'cursor': cursor, 'ordering': ordering})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_bulk_operations(self):
+        """测试批量创建、更新和删除"""
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('entry-bulk')
+        
+        create = [
+            {
+                'type': 'person', 'title': f'朋友{i}', 'relationship': 'friend',
+                'emotional_value': 8, 'tags': ['朋友'], 'story_content': '一起长大的朋友'
+            }
+            for i in range(50)
+        ]
+        create.append({'type': 'item', 'title': '测试物品', 'importance_score': 11})
+        data = {
+            'create': create,
+            'update': [
+                {'id': self.item_entry.pk, 'title': '批量更新的物品', 'tags': ['更新']},
+                {'id': self.other_user_entry.pk, 'title': '不能更新'},
+            ],
+            'delete': [self.person_entry.pk],
+        }
+        
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['created']), 50)
+        self.assertEqual(response.data['updated'], [{'index': 0, 'id': self.item_entry.pk}])
+        self.assertEqual(response.data['deleted'], [self.person_entry.pk])
+        errors = {(error['operation'], error['index']) for error in response.data['errors']}
+        self.assertEqual(errors, {('create', 50), ('update', 1)})
+        
+        created = Entry.objects.get(pk=response.data['created'][0]['id'])
+        self.assertEqual(created.user, self.user1)
+        self.assertEqual(created.calculated_importance, round(8 * 0.35 + 5 * 0.25 + 5 * 0.25 + 5 * 0.15, 2))
+        self.assertIsNotNone(created.story_last_modified)
+        
+        self.item_entry.refresh_from_db()
+        self.assertEqual(self.item_entry.title, '批量更新的物品')
+        self.assertFalse(Entry.objects.filter(pk=self.person_entry.pk).exists())
+        self.assertFalse(Entry.objects.filter(pk=self.other_user_entry.pk, title='不能更新').exists())
+        
+        # 标签计数和搜索索引与逐条写入保持一致
+        self.assertEqual(
+            dict(TagCount.objects.filter(user=self.user1).values_list('tag', 'count')),
+            {'朋友': 50, '更新': 1}
+        )
+        response = self.client.get(reverse('entry-list'), {'search': '长大'})
+        self.assertEqual(response.data['count'], 50)
+        response = self.client.get(reverse('entry-list'), {'tags': '更新'})
+        self.assertEqual(response.data['count'], 1)
+        
+        # id 不是整数（包括布尔值）时记录为错误，不会按条目 1 处理
+        data = {
+            'update': [{'id': [1], 'title': 'x'}, {'id': {'pk': 1}, 'title': 'x'}, {'id': True, 'title': 'x'}],
+            'delete': [[1], True],
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], [])
+        self.assertEqual(response.data['deleted'], [])
+        self.assertEqual(
+            [(error['operation'], error['index']) for error in response.data['errors']],
+            [('update', 0), ('update', 1), ('update', 2), ('delete', 0), ('delete', 1)]
+        )
+        self.assertEqual(response.data['errors'][0]['errors'], {'id': ['条目不存在']})
+    
+    def test_export_streams_ndjson_and_csv(self):
+        """测试流式导出"""
+        import csv
+        import io
+        import json
+        from valuations.models import ValuationRecord
+        
+        self.client.force_authenticate(user=self.user1)
+        EntryMedia.objects.create(entry=self.item_entry, file='entry_media/photo.jpg', is_primary=True)
+        ValuationRecord.objects.create(
+            entry=self.item_entry, original_price=Decimal('999.99'), current_value=Decimal('800.00'),
+            depreciation_rate=Decimal('0.2500'), age_in_months=3, methodology='测试'
+        )
+        url = reverse('entry-export')
+        
+        response = self.client.get(url, {'include': 'media,valuations'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual({row['id'] for row in rows}, {self.item_entry.pk, self.person_entry.pk})
+        
+        item = next(row for row in rows if row['id'] == self.item_entry.pk)
+        self.assertEqual(item['original_price'], '999.99')
+        self.assertEqual(item['acquisition_date'], self.item_entry.acquisition_date.isoformat())
+        self.assertEqual(item['media'][0]['file_url'], 'http://testserver/media/entry_media/photo.jpg')
+        self.assertEqual(item['valuations'][0]['current_value'], '800.00')
+        self.assertNotIn('search_document', item)
+        
+        response = self.client.get(url, {'output': 'csv', 'type': 'person'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], '张三')
+        self.assertEqual(json.loads(rows[0]['tags']), [])
+        
+        response = self.client.get(url, {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_conditional_get(self):
+        """测试 ETag / Last-Modified 条件请求"""
+        self.client.force_authenticate(user=self.user1)
+        detail_url = reverse('entry-detail', kwargs={'pk': self.item_entry.pk})
+        list_url = reverse('entry-list')
+        
+        response = self.client.get(detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        
+        # 未变化时只执行一条查询，直接返回 304
+        with self.assertNumQueries(1):
+            response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        # 媒体文件变化同样使 ETag 失效
+        EntryMedia.objects.create(entry=self.item_entry, file='entry_media/new.jpg')
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        
+        response = self.client.get(list_url)
+        list_etag = response['ETag']
+        response = self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        # 不同的查询参数和条目数量变化都会产生不同的 ETag
+        response = self.client.get(list_url, {'type': 'item'}, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.person_entry.delete()
+        response = self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # 列表不提供 Last-Modified：删除较早的条目后只携带 If-Modified-Since 仍返回完整列表
+        Entry.objects.create(user=self.user1, type='item', title='较早的物品')
+        Entry.objects.create(user=self.user1, type='item', title='最新的物品')
+        response = self.client.get(list_url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        count = response.data['count']
+        Entry.objects.get(user=self.user1, title='较早的物品').delete()
+        since = http_date(time.time() + 60)
+        for params in [{}, {'pagination': 'cursor'}]:
+            response = self.client.get(list_url, params, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(list_url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.data['count'], count - 1)
+        
+        # 其他用户的条目仍然返回 404
+        response = self.client.get(reverse('entry-detail', kwargs={'pk': self.other_user_entry.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_response_cache_invalidation(self):
+        """测试按用户版本化的响应缓存"""
+        from django.core.cache import caches
+        from valuations.models import ValuationRecord
+        from .cache import stats
+        
+        caches['entries'].clear()
+        stats.reset()
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('entry-statistics')
+        
+        response = self.client.get(url)
+        self.assertEqual(response.data['total_count'], 2)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['total_count'], 2)
+        
+        # 其他用户的写入不影响当前用户的缓存
+        Entry.objects.create(user=self.user2, type='item', title='其他物品')
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        
+        # 条目、媒体文件和估值记录的写入都会使缓存失效
+        Entry.objects.create(user=self.user1, type='item', title='新物品')
+        self.assertEqual(self.client.get(url).data['total_count'], 3)
+        response = self.client.get(reverse('entry-recent'))
+        self.assertEqual(len(response.data), 3)
+        
+        EntryMedia.objects.create(entry=self.item_entry, file='entry_media/cached.jpg', is_primary=True)
+        response = self.client.get(reverse('entry-recent'))
+        self.assertTrue(response.data[0]['primary_image'].endswith('cached.jpg'))
+        
+        self.client.get(url)
+        ValuationRecord.objects.create(
+            entry=self.item_entry, original_price=Decimal('999.99'), current_value=Decimal('900.00'),
+            depreciation_rate=Decimal('0.1000'), age_in_months=3, methodology='测试'
+        )
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        
+        self.client.post(reverse('entry-bulk'), {'delete': [self.person_entry.pk]}, format='json')
+        self.assertEqual(self.client.get(url).data['total_count'], 2)
+        
+        response = self.client.get(reverse('entry-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.user1.is_staff = True
+        self.user1.save()
+        response = self.client.get(reverse('entry-cache-stats'))
+        self.assertEqual(response.data['actions']['statistics'], {'hits': 2, 'misses': 5, 'hit_rate': 0.2857})
+    
+    def test_sparse_fieldsets(self):
+        """测试 ?fields= / ?exclude= / ?expand= 字段选择"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        self.client.force_authenticate(user=self.user1)
+        EntryMedia.objects.create(entry=self.item_entry, file='entry_media/a.jpg', is_primary=True)
+        EntryMedia.objects.create(entry=self.item_entry, file='entry_media/b.jpg')
+        list_url = reverse('entry-list')
+        
+        # 只加载请求的列，不预取媒体文件，也不会逐行补查延迟加载的列
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(list_url, {'fields': 'id,title,importance_score'})
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertNotIn('story_content', context.captured_queries[1]['sql'])
+        self.assertNotIn('search_document', context.captured_queries[1]['sql'])
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'importance_score'})
+        
+        response = self.client.get(list_url, {'fields': 'id,title', 'expand': 'media_files'})
+        item = next(row for row in response.data['results'] if row['id'] == self.item_entry.pk)
+        self.assertEqual(set(item), {'id', 'title', 'media_files'})
+        self.assertEqual(len(item['media_files']), 2)
+        
+        response = self.client.get(list_url, {'exclude': 'description,tags'})
+        self.assertIn('primary_image', response.data['results'][0])
+        self.assertNotIn('tags', response.data['results'][0])
+        
+        # 详情默认仍返回全部媒体文件，可以排除
+        detail_url = reverse('entry-detail', kwargs={'pk': self.item_entry.pk})
+        response = self.client.get(detail_url)
+        self.assertEqual(len(response.data['media_files']), 2)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(detail_url, {'exclude': 'media_files,story_content,contact_info,decorations'})
+        self.assertNotIn('media_files', response.data)
+        self.assertIn('has_story', response.data)
+        self.assertIn('age_in_days', response.data)
+        self.assertFalse(any('entry_media' in query['sql'] for query in context.captured_queries))
+        self.assertNotIn('"contact_info"', context.captured_queries[-1]['sql'])
+    
+    def test_fast_list_serialization_matches_serializer(self):
+        """快速列表序列化的输出与 EntryListSerializer 逐字节一致"""
+        from unittest import mock
+        from django.core.cache import caches
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from .fast_serializers import FastEntryListSerializer
+        from .serializers import EntryListSerializer
+        from .views import EntryViewSet
+        
+        EntryMedia.objects.create(entry=self.item_entry, file='entry_media/primary.jpg', is_primary=True)
+        EntryMedia.objects.create(entry=self.item_entry, file='entry_media/other.jpg')
+        EntryMedia.objects.create(entry=self.person_entry, type='video', file='entry_media/v.mp4', is_primary=True)
+        Entry.objects.create(
+            user=self.user1, type='item', title='含空白故事', story_content='   ', tags=['a', '中文'],
+            emotional_value=7, description=''
+        )
+        Entry.objects.create(user=self.user1, type='person', title='有故事', story_content='<p>故事</p>')
+        
+        for params in [{}, {'fields': 'id,title,has_story'}, {'exclude': 'primary_image,tags'}]:
+            request = Request(APIRequestFactory().get('/api/entries/', params))
+            serializer = EntryListSerializer(context={'request': request})
+            fast_serializer = FastEntryListSerializer.for_serializer(serializer)
+            queryset = serializer.optimize_queryset(Entry.objects.filter(user=self.user1).order_by('-updated_at'))
+            expected = JSONRenderer().render(EntryListSerializer(queryset, many=True, context={'request': request}).data)
+            actual = JSONRenderer().render(fast_serializer.serialize(fast_serializer.prepare_queryset(queryset)))
+            self.assertEqual(actual, expected)
+        
+        # 展开全部媒体文件时退回到 EntryListSerializer
+        request = Request(APIRequestFactory().get('/api/entries/', {'expand': 'media_files'}))
+        self.assertIsNone(FastEntryListSerializer.for_serializer(EntryListSerializer(context={'request': request})))
+        
+        self.client.force_authenticate(user=self.user1)
+        for url, params in [
+            (reverse('entry-list'), {}),
+            (reverse('entry-list'), {'pagination': 'cursor', 'page_size': 2}),
+            (reverse('entry-by-type'), {}),
+            (reverse('entry-by-importance'), {}),
+        ]:
+            caches['entries'].clear()
+            fast_response = self.client.get(url, params)
+            caches['entries'].clear()
+            with mock.patch.object(EntryViewSet, 'fast_list_serialization', False):
+                response = self.client.get(url, params)
+            self.assertEqual(fast_response.content, response.content)
@@ -1,10 +1,14 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.utils import timezone
 from decimal import Decimal
-from datetime import date, timedelta
-from .models import Entry, EntryMedia
+from datetime import date, timedelta, timezone as dt_timezone
+from io import StringIO
+from .models import Entry, EntryMedia, TagCount
 
 User = get_user_model()
 
@@ -235,6 +239,165 @@ class EntryModelTest(TestCase):
         self.assertIn('border-gold', entry.decorations)
         self.assertEqual(len(entry.tags), 3)
         self.assertEqual(len(entry.decorations), 2)
+        
+        entry.tags = ['x' * 256]
+        with self.assertRaises(ValidationError):
+            entry.full_clean()
+    
+    def test_calculated_importance_stored_on_save(self):
+        """测试综合重要度在保存时写入数据库"""
+        entry = Entry.objects.create(user=self.user, type='item', title='测试物品')
+        entry.emotional_value = 10
+        entry.save(update_fields=['emotional_value'])
+        
+        stored = Entry.objects.values_list('calculated_importance', flat=True).get(pk=entry.pk)
+        self.assertEqual(stored, round(10 * 0.35 + 5 * 0.25 + 5 * 0.25 + 5 * 0.15, 2))
+    
+    def test_save_writes_only_changed_fields(self):
+        """测试更新条目只执行一条 UPDATE 且只写入变化的列"""
+        entry = Entry.objects.create(user=self.user, type='item', title='测试物品')
+        entry = Entry.objects.get(pk=entry.pk)
+        entry.emotional_value = 9
+        
+        with CaptureQueriesContext(connection) as queries:
+            entry.save()
+        
+        # 重要度变化时另有一条快照 INSERT
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(queries[1]['sql'].startswith('INSERT INTO "entry_importance_snapshots"'))
+        sql = queries[0]['sql']
+        self.assertTrue(sql.startswith('UPDATE'))
+        for column in ['emotional_value', 'calculated_importance', 'importance_last_evaluated', 'updated_at']:
+            self.assertIn(f'"{column}"', sql)
+        for column in ['title', 'story_content', 'tags']:
+            self.assertNotIn(f'"{column}"', sql)
+        
+        entry.refresh_from_db()
+        self.assertIsNotNone(entry.importance_last_evaluated)
+        self.assertEqual(entry.calculated_importance, round(9 * 0.35 + 5 * 0.25 + 5 * 0.25 + 5 * 0.15, 2))
+        
+        # 没有变化时只更新 updated_at；调用方选择跳过时不写数据库
+        updated_at = entry.updated_at
+        with CaptureQueriesContext(connection) as queries:
+            entry.save()
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"updated_at"', queries[0]['sql'])
+        self.assertNotIn('"emotional_value"', queries[0]['sql'])
+        self.assertGreater(entry.updated_at, updated_at)
+        with self.assertNumQueries(0):
+            entry.save(skip_unchanged=True)
+
+    def test_event_date_maintained(self):
+        """测试事件日期按获得日期、认识日期、创建日期的顺序维护"""
+        entry = Entry.objects.create(user=self.user, type='person', title='张三')
+        created_date = entry.created_at.astimezone(dt_timezone.utc).date()
+        self.assertEqual(entry.event_date, created_date)
+
+        entry.meeting_date = date(2020, 5, 1)
+        entry.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.event_date, date(2020, 5, 1))
+
+        entry.acquisition_date = date(2019, 1, 1)
+        entry.save()
+        self.assertEqual(Entry.objects.get(pk=entry.pk).event_date, date(2019, 1, 1))
+
+        entry.acquisition_date = None
+        entry.meeting_date = None
+        entry.save()
+        self.assertEqual(Entry.objects.get(pk=entry.pk).event_date, created_date)
+
+        # 日期范围查询使用 (user, event_date) 索引
+        plan = Entry.objects.filter(user=self.user, event_date__gte=date(2020, 1, 1)).explain()
+        self.assertIn('entries_user_id_f3b9f2_idx', plan)
+
+    def test_importance_snapshots(self):
+        """测试新建和重要度字段变化时追加快照，批量更新的快照一次写入"""
+        from .bulk import bulk_update_entries
+        
+        def scores(entry):
+            return list(entry.importance_snapshots.values_list('emotional_value', 'calculated_importance'))
+        
+        entry = Entry.objects.create(user=self.user, type='item', title='测试物品')
+        entry.title = '改名'
+        entry.save()
+        entry.emotional_value = 9
+        entry.save()
+        entry.emotional_value = 2
+        entry.save()
+        self.assertEqual(scores(entry), [(5, 5.0), (9, 6.4), (2, 3.95)])
+        
+        others = [Entry.objects.create(user=self.user, type='item', title=f'另一个{i}') for i in range(3)]
+        entry.practical_value = 8
+        others[0].title = '只改标题'
+        for other in others[1:]:
+            other.emotional_value = 7
+        with CaptureQueriesContext(connection) as queries:
+            bulk_update_entries([entry, *others])
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "entry_importance_snapshots"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(entry.importance_snapshots.count(), 4)
+        self.assertEqual([other.importance_snapshots.count() for other in others], [1, 2, 2])
+        
+        # 事务回滚时快照一起丢弃
+        from django.db import transaction
+        try:
+            with transaction.atomic():
+                entry.importance_score = 1
+                entry.save()
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(entry.importance_snapshots.count(), 4)
+        
+        # 嵌套事务回滚时只丢弃其中的快照
+        nested = Entry.objects.create(user=self.user, type='item', title='嵌套')
+        with transaction.atomic():
+            nested.emotional_value = 9
+            nested.save()
+            try:
+                with transaction.atomic():
+                    nested.emotional_value = 1
+                    nested.save()
+                    raise ValueError
+            except ValueError:
+                pass
+        nested.refresh_from_db()
+        self.assertEqual(nested.emotional_value, 9)
+        self.assertEqual([value for value, _ in scores(nested)], [5, 9])
+    
+    def test_lttb_downsampling(self):
+        """测试 LTTB 保留首尾和峰值，点数不超过上限"""
+        from .history import lttb
+        
+        points = [(x, 10.0 if x == 503 else float(x % 7)) for x in range(1000)]
+        selected = lttb(points, 50)
+        self.assertEqual(len(selected), 50)
+        self.assertEqual(selected, sorted(selected))
+        self.assertEqual((selected[0], selected[-1]), (0, 999))
+        self.assertIn(503, selected)
+        self.assertEqual(lttb(points[:10], 50), list(range(10)))
+
+
+class ImportanceSnapshotTransactionTest(TransactionTestCase):
+    """不在事务中保存条目时的重要度快照测试"""
+    
+    def test_save_and_snapshot_share_transaction(self):
+        """测试条目的 UPDATE 和快照的 INSERT 在同一个事务中执行"""
+        user = User.objects.create_user(username='snapshot', email='snapshot@example.com', password='testpass123')
+        entry = Entry.objects.create(user=user, type='item', title='测试物品')
+        statements = []
+        
+        def record(execute, sql, params, many, context):
+            statements.append((sql.split()[0], connection.in_atomic_block))
+            return execute(sql, params, many, context)
+        
+        entry.emotional_value = 9
+        with connection.execute_wrapper(record):
+            entry.save()
+        writes = [statement for statement in statements if statement[0] in ('UPDATE', 'INSERT')]
+        self.assertEqual(writes, [('UPDATE', True), ('INSERT', True)])
+        self.assertEqual(entry.importance_snapshots.count(), 2)
 
 
 class EntryMediaModelTest(TestCase):
@@ -308,4 +471,138 @@ class EntryMediaModelTest(TestCase):
         
         # 主要媒体应该排在第一位
         self.assertEqual(media_list[0], media2)
-        self.assertTrue(media_list[0].is_primary)
\ No newline at end of file
+        self.assertTrue(media_list[0].is_primary)
+
+
+class TagCountTest(TestCase):
+    """标签计数维护测试"""
+    
+    def setUp(self):
+        """设置测试数据"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+    
+    def counts(self):
+        return dict(TagCount.objects.filter(user=self.user).values_list('tag', 'count'))
+    
+    def test_counts_follow_entry_changes(self):
+        """测试创建、更新和删除条目时标签计数同步更新"""
+        entry1 = Entry.objects.create(user=self.user, type='item', title='物品1', tags=['工作', '重要'])
+        entry2 = Entry.objects.create(user=self.user, type='item', title='物品2', tags=['工作'])
+        self.assertEqual(self.counts(), {'工作': 2, '重要': 1})
+        
+        entry1 = Entry.objects.get(pk=entry1.pk)
+        entry1.tags = ['重要', '收藏']
+        entry1.save()
+        self.assertEqual(self.counts(), {'工作': 1, '重要': 1, '收藏': 1})
+        
+        entry2.delete()
+        self.assertEqual(self.counts(), {'重要': 1, '收藏': 1})
+    
+    def test_rebuild_command(self):
+        """测试重建标签计数命令"""
+        Entry.objects.create(user=self.user, type='item', title='物品1', tags=['工作', '重要'])
+        Entry.objects.create(user=self.user, type='item', title='物品2', tags=['工作'])
+        TagCount.objects.all().delete()
+        
+        call_command('rebuild_tag_counts', stdout=StringIO())
+        self.assertEqual(self.counts(), {'工作': 2, '重要': 1})
+
+
+class ImportEntriesTest(TestCase):
+    """批量导入命令测试"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', email='importer@example.com', password='testpass123')
+    
+    def write_file(self, suffix, content):
+        import os
+        import tempfile
+        
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+    
+    def test_import_ndjson(self):
+        """测试导入 NDJSON，包括关联数据和无效行"""
+        import json
+        from stories.models import Story
+        from valuations.models import ValuationRecord
+        
+        archived = '2020-01-02T03:04:05+00:00'
+        rows = [
+            {
+                'type': 'item', 'title': '旧相机', 'tags': ['摄影', '收藏'], 'emotional_value': 9,
+                'story_content': '<p>第一台相机</p>', 'story_last_modified': archived, 'created_at': archived,
+                'media': [{'file': 'entry_media/camera.jpg', 'is_primary': True}],
+                'story': '关于相机的故事',
+                'valuations': [{
+                    'calculated_at': archived, 'original_price': '1000.00', 'current_value': '600.00',
+                    'depreciation_rate': '0.2500', 'age_in_months': 24, 'methodology': '导入'
+                }],
+            },
+            {'type': 'person', 'title': '老朋友', 'tags': ['摄影'], 'story_content': '一起拍照'},
+            {'type': 'unknown', 'title': '无效类型'},
+            {'type': 'item', 'title': '第三个', 'tags': []},
+        ]
+        path = self.write_file('.ndjson', '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows) + '\nnot json\n')
+        
+        out, err = StringIO(), StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('import_entries', path, user='importer', batch_size=2, stdout=out, stderr=err)
+        self.assertIn('导入完成：3 个条目', out.getvalue())
+        # 归档时间在写入前设置，不再逐批 UPDATE，导入后自动时间字段恢复原样
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE') and 'CASE WHEN' in query['sql']
+        ])
+        self.assertTrue(Entry._meta.get_field('created_at').auto_now_add)
+        self.assertTrue(Entry._meta.get_field('updated_at').auto_now)
+        self.assertIn('行/秒', out.getvalue())
+        self.assertIn('第 3 行', err.getvalue())
+        self.assertIn('第 5 行', err.getvalue())
+        
+        camera = Entry.objects.get(user=self.user, title='旧相机')
+        self.assertEqual(camera.created_at.isoformat(), archived)
+        self.assertEqual(camera.story_last_modified.isoformat(), archived)
+        self.assertEqual(camera.calculated_importance, camera.compute_calculated_importance())
+        self.assertTrue(camera.get_primary_image())
+        self.assertEqual(Story.objects.get(entry=camera).content, '关于相机的故事')
+        valuation = ValuationRecord.objects.get(entry=camera)
+        self.assertEqual(valuation.calculated_at.isoformat(), archived)
+        self.assertEqual(valuation.current_value, Decimal('600.00'))
+        
+        # 没有归档时间的故事按新建条目填写修改时间，没有故事的条目保持为空
+        self.assertIsNotNone(Entry.objects.get(title='老朋友').story_last_modified)
+        self.assertIsNone(Entry.objects.get(title='第三个').story_last_modified)
+        self.assertEqual(
+            dict(TagCount.objects.filter(user=self.user).values_list('tag', 'count')),
+            {'摄影': 2, '收藏': 1}
+        )
+        self.assertEqual(Entry.objects.filter(user=self.user, tag_links__tag='摄影').count(), 2)
+    
+    def test_import_exported_csv(self):
+        """导出的 CSV 可以直接导入"""
+        from .export import EntryExporter
+        
+        source = User.objects.create_user(username='source', email='source@example.com', password='testpass123')
+        Entry.objects.create(
+            user=source, type='item', title='书桌', original_price=Decimal('1200.50'),
+            acquisition_date=date(2020, 5, 1), tags=['家具'], decorations=[{'type': 'star'}]
+        )
+        Entry.objects.create(user=source, type='person', title='邻居', description='多行\n描述')
+        content = ''.join(EntryExporter(Entry.objects.filter(user=source), includes=['media']).iter_csv())
+        path = self.write_file('.csv', content)
+        
+        call_command('import_entries', path, user='importer', stdout=StringIO(), stderr=StringIO())
+        desk = Entry.objects.get(user=self.user, title='书桌')
+        self.assertEqual(desk.original_price, Decimal('1200.50'))
+        self.assertEqual(desk.acquisition_date, date(2020, 5, 1))
+        self.assertEqual(desk.decorations, [{'type': 'star'}])
+        self.assertEqual(Entry.objects.get(user=self.user, title='邻居').description, '多行\n描述')
+        self.assertEqual(TagCount.objects.get(user=self.user, tag='家具').count, 1)
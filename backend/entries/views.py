@@ -1,16 +1,42 @@
 from rest_framework import viewsets, status, filters, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.core.exceptions import ValidationError
 from django.db.models import Q, Count
 from django.utils import timezone
 from .models import Entry, EntryMedia
+from .aggregations import (
+    TIMELINE_INTERVALS,
+    entry_statistics,
+    recent_by_type,
+    timeline_buckets,
+    type_group,
+    type_overview
+)
+from .tagging import filter_by_tags
+from .search import EntrySearchFilter
+from .pagination import EntryCursorPagination, EntryPageNumberPagination, entry_value
+from .bulk import MAX_BULK_SIZE, BulkEntryProcessor
+from .export import EXPORT_FORMATS, EntryExporter
+from .history import DEFAULT_POINTS, MAX_POINTS, MIN_POINTS, importance_series
+from . import cache as entry_cache
+from .fast_serializers import FastEntryListSerializer
+from .conditional import (
+    detail_validators,
+    list_summary,
+    list_validators,
+    not_modified_response,
+    page_validators,
+    set_validator_headers
+)
 from .serializers import (
     EntrySerializer, 
     EntryListSerializer, 
     EntryCreateUpdateSerializer,
     EntryMediaSerializer,
+    ImportanceSnapshotSerializer,
     StoryContentSerializer
 )
 
@@ -30,15 +56,47 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
 class EntryViewSet(viewsets.ModelViewSet):
     """条目视图集 - 提供完整的CRUD操作"""
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, EntrySearchFilter]
     filterset_fields = ['type', 'category', 'condition', 'relationship', 'is_private']
     search_fields = ['title', 'description', 'story_content', 'tags']
-    ordering_fields = ['created_at', 'updated_at', 'importance_score', 'calculated_importance', 'acquisition_date', 'meeting_date']
+    ordering_fields = ['created_at', 'updated_at', 'importance_score', 'calculated_importance', 'event_date', 'acquisition_date', 'meeting_date']
     ordering = ['-updated_at']
+    pagination_class = EntryPageNumberPagination
+    
+    # 使用 EntryListSerializer 的动作，默认只需要主要图片，不需要全部媒体文件
+    list_actions = ['list', 'recent', 'by_type', 'by_importance', 'search_advanced']
+    
+    # 列表类动作使用基于 values() 的快速序列化（输出与 EntryListSerializer 一致）
+    fast_list_serialization = True
+    
+    # 支持通过 ?pagination=cursor 切换到键集分页的动作
+    cursor_pagination_actions = ['list', 'search_advanced']
+    
+    @property
+    def paginator(self):
+        """根据请求选择分页器：默认页码分页，可选键集分页"""
+        if not hasattr(self, '_paginator'):
+            if (self.action in self.cursor_pagination_actions
+                    and EntryCursorPagination.is_requested(self.request)):
+                self._paginator = EntryCursorPagination()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
     
     def get_queryset(self):
-        """获取当前用户的条目"""
-        queryset = Entry.objects.filter(user=self.request.user).prefetch_related('media_files')
+        """
+        获取当前用户的条目，读取类动作只加载响应字段需要的列和关联数据
+
+        应用了任何查询参数过滤时 self.filters_applied 为 True。
+        """
+        queryset = Entry.objects.filter(user=self.request.user)
+        self.filters_applied = False
+        if self.action in self.list_actions or self.action == 'retrieve':
+            queryset = self.get_read_serializer().optimize_queryset(queryset)
+        elif self.action != 'importance_history':
+            queryset = queryset.prefetch_related('media_files')
         
         # 支持按重要度过滤
         min_importance = self.request.query_params.get('min_importance')
@@ -46,26 +104,69 @@ class EntryViewSet(viewsets.ModelViewSet):
             try:
                 min_importance = int(min_importance)
                 queryset = queryset.filter(importance_score__gte=min_importance)
+                self.filters_applied = True
             except ValueError:
                 pass
         
-        # 支持按标签过滤
-        tags = self.request.query_params.get('tags')
-        if tags:
-            tag_list = [tag.strip() for tag in tags.split(',')]
-            for tag in tag_list:
-                queryset = queryset.filter(tags__contains=[tag])
+        # 支持按标签过滤：tags 同时包含（AND），tags_any 任一包含（OR），tags_exclude 不包含（NOT）
+        all_tags = self._get_list_param('tags')
+        any_tags = self._get_list_param('tags_any')
+        exclude_tags = self._get_list_param('tags_exclude')
+        if all_tags or any_tags or exclude_tags:
+            queryset = filter_by_tags(
+                queryset, self.request.user,
+                all_tags=all_tags, any_tags=any_tags, exclude_tags=exclude_tags
+            )
+            self.filters_applied = True
         
         # 支持按是否有故事过滤
         has_story = self.request.query_params.get('has_story')
         if has_story is not None:
             if has_story.lower() in ['true', '1']:
                 queryset = queryset.exclude(story_content__isnull=True).exclude(story_content='')
+                self.filters_applied = True
             elif has_story.lower() in ['false', '0']:
                 queryset = queryset.filter(Q(story_content__isnull=True) | Q(story_content=''))
+                self.filters_applied = True
         
         return queryset
     
+    def _get_list_param(self, param):
+        """解析逗号分隔的列表参数"""
+        value = self.request.query_params.get(param)
+        if not value:
+            return []
+        return [tag.strip() for tag in value.split(',') if tag.strip()]
+    
+    def get_read_serializer(self):
+        """当前读取类动作使用的序列化器实例，用于确定需要加载的列"""
+        serializer_class = EntryListSerializer if self.action in self.list_actions else EntrySerializer
+        return serializer_class(context=self.get_serializer_context())
+    
+    def get_fast_list_serializer(self):
+        """列表类动作可用时返回快速序列化器，字段无法快速处理时返回 None"""
+        if not self.fast_list_serialization:
+            return None
+        if not hasattr(self, '_fast_list_serializer'):
+            self._fast_list_serializer = FastEntryListSerializer.for_serializer(
+                EntryListSerializer(context=self.get_serializer_context())
+            )
+        return self._fast_list_serializer
+    
+    def get_list_rows(self, queryset):
+        """列表类动作分页和序列化使用的查询集，使用快速序列化时为 values() 查询集"""
+        fast_serializer = self.get_fast_list_serializer()
+        if fast_serializer is None:
+            return queryset
+        return fast_serializer.prepare_queryset(queryset)
+    
+    def serialize_list(self, entries):
+        """序列化 get_list_rows() 得到的条目"""
+        fast_serializer = self.get_fast_list_serializer()
+        if fast_serializer is None:
+            return EntryListSerializer(entries, many=True, context=self.get_serializer_context()).data
+        return fast_serializer.serialize(entries)
+    
     def get_serializer_class(self):
         """根据动作选择序列化器"""
         if self.action == 'list':
@@ -80,6 +181,50 @@ class EntryViewSet(viewsets.ModelViewSet):
         """创建条目时设置用户"""
         serializer.save(user=self.request.user)
     
+    def list(self, request, *args, **kwargs):
+        """条目列表，支持 ETag 条件请求，响应按用户缓存"""
+        return entry_cache.cached_response(request, 'list', self._list_response)
+    
+    def _list_response(self):
+        request = self.request
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        rows = self.get_list_rows(queryset)
+        page = None
+        if isinstance(self.paginator, EntryCursorPagination):
+            # 键集分页不统计总数，按当前页的条目计算校验值
+            page = self.paginate_queryset(rows)
+            validators = page_validators(request, page)
+        else:
+            summary = list_summary(queryset)
+            validators = list_validators(request, summary)
+            if self.paginator is not None:
+                self.paginator.known_count = summary['count']
+        
+        not_modified = not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        
+        if page is None:
+            page = self.paginate_queryset(rows)
+        if page is not None:
+            response = self.get_paginated_response(self.serialize_list(page))
+        else:
+            response = Response(self.serialize_list(rows))
+        return set_validator_headers(response, validators)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """条目详情，支持 ETag / Last-Modified 条件请求"""
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            validators = detail_validators(request, self.filter_queryset(self.get_queryset()), pk)
+        except (TypeError, ValueError, ValidationError):
+            validators = None
+        not_modified = not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        return set_validator_headers(super().retrieve(request, *args, **kwargs), validators)
+    
     def create(self, request, *args, **kwargs):
         """创建条目"""
         serializer = self.get_serializer(data=request.data)
@@ -102,6 +247,35 @@ class EntryViewSet(viewsets.ModelViewSet):
         response_serializer = EntrySerializer(entry, context={'request': request})
         return Response(response_serializer.data)
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """批量创建、更新和删除条目"""
+        data = request.data
+        if not isinstance(data, dict):
+            return Response({'error': '请求体必须是包含 create/update/delete 的对象'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        operations = [data.get(key) or [] for key in ['create', 'update', 'delete']]
+        if not all(isinstance(items, list) for items in operations):
+            return Response({'error': 'create、update、delete 必须是数组'}, status=status.HTTP_400_BAD_REQUEST)
+        if sum(len(items) for items in operations) > MAX_BULK_SIZE:
+            return Response({'error': f'单次最多处理 {MAX_BULK_SIZE} 个条目'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(BulkEntryProcessor(request).process(data))
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """流式导出条目（NDJSON 或 CSV），支持列表端点的所有过滤参数"""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"output 必须是 {', '.join(EXPORT_FORMATS)} 之一"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        includes = self._get_list_param('include')
+        queryset = self.filter_queryset(self.get_queryset())
+        return EntryExporter(queryset, request=request, includes=includes).response(output)
+    
     @action(detail=True, methods=['put', 'patch'])
     def update_story(self, request, pk=None):
         """更新条目的故事内容"""
@@ -113,88 +287,108 @@ class EntryViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['get'])
+    def importance_history(self, request, pk=None):
+        """重要度历史时间序列，?points= 限制返回的点数（服务端 LTTB 降采样）"""
+        entry = self.get_object()
+        try:
+            max_points = int(request.query_params.get('points', DEFAULT_POINTS))
+        except ValueError:
+            max_points = None
+        if max_points is None or not MIN_POINTS <= max_points <= MAX_POINTS:
+            return Response(
+                {'error': f'points 必须是 {MIN_POINTS} 到 {MAX_POINTS} 之间的整数'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        total, rows = importance_series(entry, max_points)
+        return Response({
+            'entry': entry.pk,
+            'total': total,
+            'points': ImportanceSnapshotSerializer(rows, many=True).data,
+        })
+    
     @action(detail=False, methods=['get'])
     def by_importance(self, request):
         """按重要度排序的条目列表"""
-        queryset = self.filter_queryset(self.get_queryset())
+        queryset = self.filter_queryset(self.get_queryset()).order_by(
+            '-calculated_importance', '-importance_score', '-updated_at'
+        )
         
-        # 获取所有条目并在Python中排序（因为calculated_importance是属性）
-        entries = list(queryset)
-        entries.sort(key=lambda x: (x.calculated_importance, x.importance_score), reverse=True)
-        
-        # 手动分页
-        page = self.paginate_queryset(entries)
+        rows = self.get_list_rows(queryset)
+        page = self.paginate_queryset(rows)
         if page is not None:
-            serializer = EntryListSerializer(page, many=True, context={'request': request})
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(self.serialize_list(page))
         
-        serializer = EntryListSerializer(entries, many=True, context={'request': request})
-        return Response(serializer.data)
+        return Response(self.serialize_list(rows))
     
     @action(detail=False, methods=['get'])
     def recent(self, request):
         """最近更新的条目"""
-        queryset = self.filter_queryset(self.get_queryset())[:10]  # 最近10个
-        serializer = EntryListSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        return entry_cache.cached_response(request, 'recent', self._recent_response)
+    
+    def _recent_response(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.serialize_list(self.get_list_rows(queryset)[:10]))  # 最近10个
     
     @action(detail=False, methods=['get'])
     def by_type(self, request):
         """按类型分组的条目统计"""
+        return entry_cache.cached_response(request, 'by_type', self._by_type_response)
+    
+    def _by_type_response(self):
+        """
+        每个类型的条目数、分面和最近更新的 5 个条目
+
+        计数和分面一次 GROUP BY，各类型的 top 5 一次窗口函数查询，查询数不随类型数量增加。
+        """
         queryset = self.get_queryset()
+        overview = type_overview(queryset)
         
-        items = queryset.filter(type='item')
-        persons = queryset.filter(type='person')
+        rows = list(self.get_list_rows(recent_by_type(queryset, limit=5)))
+        recent = {entry_type: [] for entry_type in overview}
+        for entry, data in zip(rows, self.serialize_list(rows)):
+            recent.setdefault(entry_value(entry, 'type'), []).append(data)
         
         return Response({
-            'items': {
-                'count': items.count(),
-                'categories': list(items.values_list('category', flat=True).distinct().exclude(category='')),
-                'recent': EntryListSerializer(items[:5], many=True, context={'request': request}).data
-            },
-            'persons': {
-                'count': persons.count(),
-                'relationships': list(persons.values_list('relationship', flat=True).distinct().exclude(relationship='')),
-                'recent': EntryListSerializer(persons[:5], many=True, context={'request': request}).data
-            }
+            type_group(entry_type)[0]: {**summary, 'recent': recent[entry_type]}
+            for entry_type, summary in overview.items()
         })
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """条目统计信息"""
+        return entry_cache.cached_response(request, 'statistics', self._statistics_response)
+    
+    def _statistics_response(self):
+        # 没有过滤时标签统计直接读取维护好的 TagCount 计数表
         queryset = self.get_queryset()
-        total_count = queryset.count()
-        item_count = queryset.filter(type='item').count()
-        person_count = queryset.filter(type='person').count()
-        
-        # 统计有故事的条目
-        with_story_count = queryset.exclude(story_content__isnull=True).exclude(story_content='').count()
-        
-        # 统计重要度分布
-        importance_distribution = {}
-        for i in range(1, 11):
-            importance_distribution[str(i)] = queryset.filter(importance_score=i).count()
-        
+        return Response(entry_statistics(queryset, user=None if self.filters_applied else self.request.user))
+    
+    @action(detail=False, methods=['get'])
+    def timeline(self, request):
+        """按月或按年汇总条目数、平均重要度和原价合计，支持列表端点的过滤参数"""
+        interval = request.query_params.get('interval', 'month')
+        if interval not in TIMELINE_INTERVALS:
+            return Response(
+                {'error': f"interval 必须是 {', '.join(TIMELINE_INTERVALS)} 之一"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return entry_cache.cached_response(request, 'timeline', self._timeline_response)
+    
+    def _timeline_response(self):
+        interval = self.request.query_params.get('interval', 'month')
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response({'interval': interval, 'buckets': timeline_buckets(queryset, interval)})
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsAdminUser])
+    def cache_stats(self, request):
+        """响应缓存的命中统计（当前进程），仅管理员可见"""
         return Response({
-            'total_count': total_count,
-            'item_count': item_count,
-            'person_count': person_count,
-            'with_story_count': with_story_count,
-            'without_story_count': total_count - with_story_count,
-            'importance_distribution': importance_distribution,
-            'categories': list(queryset.filter(type='item').values_list('category', flat=True).distinct().exclude(category='')),
-            'relationships': list(queryset.filter(type='person').values_list('relationship', flat=True).distinct().exclude(relationship='')),
-            'tags': self._get_all_tags(queryset),
+            'backend': entry_cache.get_entry_cache().__class__.__name__,
+            'actions': entry_cache.stats.snapshot(),
         })
     
-    def _get_all_tags(self, queryset):
-        """获取所有标签及其使用次数"""
-        tag_counts = {}
-        for entry in queryset:
-            for tag in entry.tags:
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-        return sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:20]  # 返回前20个最常用标签
-    
     @action(detail=True, methods=['post'])
     def upload_media(self, request, pk=None):
         """为条目上传媒体文件"""
@@ -255,7 +449,7 @@ class EntryViewSet(viewsets.ModelViewSet):
         """高级搜索"""
         queryset = self.get_queryset()
         
-        # 按日期范围搜索
+        # 按事件日期范围搜索（获得日期、认识日期或创建日期），使用 (user, event_date) 索引
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
         
@@ -263,9 +457,7 @@ class EntryViewSet(viewsets.ModelViewSet):
             try:
                 from datetime import datetime
                 date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-                queryset = queryset.filter(
-                    Q(acquisition_date__gte=date_from) | Q(meeting_date__gte=date_from)
-                )
+                queryset = queryset.filter(event_date__gte=date_from)
             except ValueError:
                 pass
         
@@ -273,9 +465,7 @@ class EntryViewSet(viewsets.ModelViewSet):
             try:
                 from datetime import datetime
                 date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-                queryset = queryset.filter(
-                    Q(acquisition_date__lte=date_to) | Q(meeting_date__lte=date_to)
-                )
+                queryset = queryset.filter(event_date__lte=date_to)
             except ValueError:
                 pass
         
@@ -300,10 +490,9 @@ class EntryViewSet(viewsets.ModelViewSet):
         # 应用其他过滤器
         queryset = self.filter_queryset(queryset)
         
-        page = self.paginate_queryset(queryset)
+        rows = self.get_list_rows(queryset)
+        page = self.paginate_queryset(rows)
         if page is not None:
-            serializer = EntryListSerializer(page, many=True, context={'request': request})
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(self.serialize_list(page))
         
-        serializer = EntryListSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(self.serialize_list(rows))
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+基于 orjson 的 JSON 渲染器
+
+输出与 DRF 的 JSONRenderer 逐字节一致。以下情况回退到标准库 json：
+- 未安装 orjson，或请求了缩进（Accept: application/json; indent=4）
+- 浮点数为 NaN / Infinity 或超出 [1e-4, 1e16)：Python 在该范围外使用科学计数法，orjson 的写法不同
+- orjson 无法编码的值，例如超过 64 位的整数、非字符串的字典键
+
+日期时间、Decimal、UUID 等由 DRF 的 JSONEncoder 转换，转换结果同样经过上述浮点数检查。
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 不需要检查的原生类型，其他值由 orjson 编码或交给 default
+_LEAF_TYPES = {str, int, bool, type(None)}
+
+_LINE_SEPARATORS = [('\u2028'.encode(), b'\\u2028'), ('\u2029'.encode(), b'\\u2029')]
+
+
+class _IncompatibleValue(Exception):
+    pass
+
+
+def _floats_compatible(data):
+    """数据中的浮点数是否都能由 orjson 输出与 float.__repr__ 相同的写法（NaN 的比较结果为 False）"""
+    stack = [[data]]
+    while stack:
+        container = stack.pop()
+        for value in container.values() if isinstance(container, dict) else container:
+            value_type = type(value)
+            if value_type in _LEAF_TYPES:
+                continue
+            if value_type is float:
+                if not (value == 0 or 1e-4 <= abs(value) < 1e16):
+                    return False
+            elif isinstance(value, (dict, list, tuple)):
+                stack.append(value)
+    return True
+
+
+class FastJSONRenderer(JSONRenderer):
+    """优先使用 orjson 编码的 JSONRenderer"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None or not self.compact or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+            or not _floats_compatible(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = self.encoder_class()
+
+        def default(value):
+            value = encoder.default(value)
+            if not _floats_compatible(value):
+                raise _IncompatibleValue
+            return value
+
+        try:
+            ret = orjson.dumps(data, default=default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            # 包括 default 转换结果不兼容；标准库也无法编码时抛出与 JSONRenderer 相同的异常
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # 与 JSONRenderer 一样转义 U+2028 / U+2029
+        for separator, escaped in _LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
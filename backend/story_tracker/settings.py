@@ -5,6 +5,7 @@ Django settings for story_tracker project.
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -97,6 +98,39 @@ else:
         }
     }
 
+# Cache
+# 条目读取接口的响应缓存（entries.cache）。失效依赖所有进程共享同一个缓存，ENTRY_CACHE_BACKEND 可选：
+# file - 共享文件目录（默认，同一主机上的多个进程共享）；db - 数据库表（需先执行 createcachetable，多主机共享）；
+# locmem - 进程内存，只适合单进程部署，WEB_CONCURRENCY 大于 1 时拒绝启动
+ENTRY_CACHE_BACKEND = config('ENTRY_CACHE_BACKEND', default='file')
+if ENTRY_CACHE_BACKEND == 'locmem' and config('WEB_CONCURRENCY', default=1, cast=int) > 1:
+    raise ImproperlyConfigured('ENTRY_CACHE_BACKEND=locmem 不能用于多进程部署，请使用 file 或 db')
+ENTRY_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'entries',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('ENTRY_CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'entries')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': config('ENTRY_CACHE_LOCATION', default='entry_cache'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'entries': {
+        **ENTRY_CACHE_BACKENDS[ENTRY_CACHE_BACKEND],
+        'TIMEOUT': config('ENTRY_CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {'MAX_ENTRIES': config('ENTRY_CACHE_MAX_ENTRIES', default=10000, cast=int)},
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -144,10 +178,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'story_tracker.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'story_tracker.parsers.FastJSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
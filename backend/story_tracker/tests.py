@@ -0,0 +1,78 @@
+import io
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from story_tracker import parsers, renderers
+from story_tracker.parsers import FastJSONParser
+from story_tracker.renderers import FastJSONRenderer
+
+
+class FastJSONTest(SimpleTestCase):
+    def test_renderer_matches_json_renderer(self):
+        payloads = [
+            {
+                'title': '条目 "引号" \\ 反斜杠\n换行\x01控制字符    😀',
+                'created_at': datetime(2024, 3, 1, 8, 30, 15, 123456, tzinfo=timezone.utc),
+                'naive': datetime(2024, 3, 1, 8, 30),
+                'acquisition_date': date(2020, 1, 2),
+                'time': time(9, 15, 30, 500),
+                'duration': timedelta(days=1, seconds=3),
+                'original_price': Decimal('1999.90'),
+                'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+                'tags': ('a', 'b'),
+                'scores': [0.1, 7.5, -0.0, 1e15, 123456789.123, True, None, 2 ** 63 - 1],
+            },
+            [{'importance': 1e-05}, {'importance': 1e16}],
+            {'big': 2 ** 70},
+            {1: 'int key'},
+            {'story': '1e5 次 0.00001'},
+            [],
+            '',
+        ]
+        for data in payloads:
+            expected = JSONRenderer().render(data)
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+            with mock.patch.object(renderers, 'orjson', None):
+                self.assertEqual(FastJSONRenderer().render(data), expected)
+
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+        self.assertEqual(
+            FastJSONRenderer().render({'a': [1]}, 'application/json; indent=4'),
+            JSONRenderer().render({'a': [1]}, 'application/json; indent=4'),
+        )
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({'value': object()})
+
+    def test_parser_matches_json_parser(self):
+        bodies = [
+            '{"title": "条目 \\u2028 😀", "tags": ["a"], "price": 1999.9, "count": 3}',
+            '{"a": 1, "a": 2}',
+            '[1e2, -0, 0.1, 9223372036854775807, -9223372036854775808, 18446744073709551615]',
+            '"\\ud83d\\ude00"',
+            '"\\ud800"',
+            '1e400',
+            # 超出 64 位的整数由标准库解析，保持精确的整数
+            '[-9223372036854775809, 18446744073709551616]',
+            '{"id": 123456789012345678901234567890, "phone": "12345678901234567890", "ratio": 0.12345678901234567890}',
+        ]
+        for body in bodies:
+            stream = body.encode()
+            expected = JSONParser().parse(io.BytesIO(stream))
+            for orjson in [parsers.orjson, None]:
+                with mock.patch.object(parsers, 'orjson', orjson):
+                    actual = FastJSONParser().parse(io.BytesIO(stream))
+                self.assertEqual(repr(actual), repr(expected))
+
+        for body in [b'', b'{"a": NaN}', b'[1,]', b'"\xff"']:
+            with self.assertRaises(ParseError) as expected:
+                JSONParser().parse(io.BytesIO(body))
+            with self.assertRaises(ParseError) as actual:
+                FastJSONParser().parse(io.BytesIO(body))
+            self.assertEqual(str(actual.exception), str(expected.exception))
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class ValuationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'valuations'
\ No newline at end of file
+    name = 'valuations'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,184 @@
+"""
+批量价值评估引擎
+
+折旧规则从进程内的规则注册表读取，符合条件的物品条目（有原价、获得日期不晚于今天）按主键分块流式读取，
+每块的当前价值由 kernel.current_values 一次算出（与逐条的 Decimal 计算逐分一致）。
+已有相同输入摘要（inputs_key）记录的条目不再写入，其余一次 bulk_create 写入估值记录。
+
+分块之间互不依赖：workers > 1 时由主进程读取，计算和写入分发到进程池，每个进程使用自己的数据库连接。
+bulk_create 不发送信号，写入完成后统一使相关用户的响应缓存失效。
+"""
+import hashlib
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from decimal import Decimal
+
+import django
+from django.utils import timezone
+
+from entries.cache import bump_generation
+from entries.models import Entry
+from .kernel import CENT, age_in_months, current_values, depreciated_value
+from .models import ValuationRecord
+from .rules import rule_registry
+
+CHUNK_SIZE = 5000
+
+CATEGORY_FACTOR = Decimal('1.0')
+
+VALUATION_ENTRY_FIELDS = ['id', 'user_id', 'original_price', 'acquisition_date', 'category', 'condition']
+
+
+def valuation_inputs_key(original_price, category, condition, rules, age):
+    """估值输入的摘要：这些输入相同时估值结果相同"""
+    price = Decimal(original_price).quantize(CENT)
+    inputs = '|'.join([str(price), category or '', condition or '', rules.version, str(age)])
+    return hashlib.sha1(inputs.encode()).hexdigest()
+
+
+def build_valuation(entry_id, original_price, acquisition_date, category, condition, rules, today, current_value=None):
+    """
+    计算一个物品的当前价值，返回未保存的 ValuationRecord
+
+    current_value 为已经由 kernel.current_values 批量算出的当前价值，没有时逐条计算。
+    """
+    age = age_in_months(acquisition_date, today)
+    depreciation_rate = rules.annual_rate(category)
+    condition_factor = rules.condition_factor(condition)
+    if current_value is None:
+        current_value = depreciated_value(original_price, age, category, condition, rules)
+    return ValuationRecord(
+        entry_id=entry_id,
+        original_price=original_price,
+        current_value=current_value,
+        depreciation_rate=depreciation_rate,
+        category_factor=CATEGORY_FACTOR,
+        condition_factor=condition_factor,
+        age_in_months=age,
+        methodology=f"使用{category}类别的年折旧率{depreciation_rate * 100:.1f}%，"
+                    f"状况因子{condition_factor}，物品年龄{age}个月进行计算",
+        inputs_key=valuation_inputs_key(original_price, category, condition, rules, age),
+    )
+
+
+def eligible_items(user_ids=None, today=None):
+    """可以估值的物品条目：有原价和获得日期，且获得日期不晚于今天"""
+    queryset = Entry.objects.filter(
+        type='item',
+        original_price__gt=0,
+        acquisition_date__isnull=False,
+        acquisition_date__lte=today or timezone.localdate(),
+    )
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    return queryset
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """按主键顺序分块读取估值需要的列，每块一次查询"""
+    queryset = queryset.order_by('id').values_list(*VALUATION_ENTRY_FIELDS)
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def write_chunk(rows, rules, today):
+    """
+    计算并写入一块条目的估值记录，返回 (新记录数, 未变化的条目数, 涉及的用户id)
+
+    已有相同输入摘要的记录的条目不再写入，一次查询找出这些条目；
+    并发写入的相同记录由唯一约束去重，计入新记录数。
+    """
+    _, _, prices, acquisition_dates, categories, conditions = zip(*rows)
+    values = current_values(prices, acquisition_dates, categories, conditions, rules, today)
+    valuations = [
+        build_valuation(entry_id, price, acquired, category, condition, rules, today, value)
+        for (entry_id, _, price, acquired, category, condition), value in zip(rows, values)
+    ]
+    existing = set(
+        ValuationRecord.objects.filter(
+            entry_id__in=[valuation.entry_id for valuation in valuations],
+            inputs_key__in={valuation.inputs_key for valuation in valuations},
+        ).values_list('entry_id', 'inputs_key')
+    )
+    changed = [valuation for valuation in valuations if (valuation.entry_id, valuation.inputs_key) not in existing]
+    changed_entries = {valuation.entry_id for valuation in changed}
+    ValuationRecord.objects.bulk_create(changed, ignore_conflicts=True)
+    user_ids = {user_id for entry_id, user_id, *_ in rows if entry_id in changed_entries}
+    return len(changed), len(valuations) - len(changed), user_ids
+
+
+class RevalueStats:
+    """批量估值进度统计"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.chunks = 0
+        self.valuations = 0
+        self.unchanged = 0
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return (self.valuations + self.unchanged) / elapsed if elapsed > 0 else 0.0
+
+
+class RevaluationEngine:
+    """
+    批量重新估值
+
+    user_ids 为 None 时处理所有用户。workers 大于 1 时使用进程池，
+    progress 回调在每块写入后以 RevalueStats 调用。
+    """
+
+    def __init__(self, user_ids=None, chunk_size=CHUNK_SIZE, workers=1, progress=None):
+        self.user_ids = user_ids
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.progress = progress
+
+    def run(self):
+        """执行估值，返回 RevalueStats"""
+        today = timezone.localdate()
+        rules = rule_registry.get()
+        chunks = iter_chunks(eligible_items(self.user_ids, today), self.chunk_size)
+        stats = RevalueStats()
+        user_ids = set()
+
+        if self.workers > 1:
+            results = self._run_in_pool(chunks, rules, today)
+        else:
+            results = (write_chunk(rows, rules, today) for rows in chunks)
+        for count, unchanged, chunk_user_ids in results:
+            stats.chunks += 1
+            stats.valuations += count
+            stats.unchanged += unchanged
+            user_ids |= chunk_user_ids
+            if self.progress:
+                self.progress(stats)
+
+        bump_generation(*user_ids)
+        return stats
+
+    def _run_in_pool(self, chunks, rules, today):
+        """
+        主进程读取分块并分发，同时在途的分块数不超过进程数的两倍
+
+        子进程使用 spawn 启动并重新初始化 Django，不会继承主进程已打开的数据库连接。
+        """
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=django.setup) as pool:
+            pending = set()
+            for rows in chunks:
+                pending.add(pool.submit(write_chunk, rows, rules, today))
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in pending:
+                yield future.result()
@@ -0,0 +1,107 @@
+"""
+估值计算核心
+
+depreciated_value 是逐条的 Decimal 计算：原价 × max((1 - 年折旧率 / 12) ^ 月龄, 最低价值百分比 / 100) × 状况因子，
+按 ROUND_HALF_UP 保留两位小数。
+
+current_values 用 NumPy 对列数组一次计算一批物品，结果与 depreciated_value 逐分一致：
+原价换算为分后在 float64 中精确表示，计算结果的相对误差不超过 (月龄 + 16) × 1e-15。
+结果距离 0.5 分的舍入边界、或折旧因子与最低价值比例的差在误差范围内的少数条目，改用 Decimal 重新计算。
+未安装 NumPy 时逐条使用 Decimal 计算。
+"""
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+from .rules import CONDITION_FACTORS, DEFAULT_CONDITION_FACTOR
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CENT = Decimal('0.01')
+
+# float64 计算的相对误差系数：1 - 月折旧率的舍入误差在幂运算中按月龄放大，其余每步运算不超过一个 ulp
+RELATIVE_ERROR = 1e-15
+RELATIVE_ERROR_MARGIN = 16
+MAX_EXACT_CENTS = 2.0 ** 53
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# 状况编码：CONDITION_FACTORS 中的顺序，其他状况（包括未填写）为最后一个编码
+CONDITION_CODES = {condition: code for code, condition in enumerate(CONDITION_FACTORS)}
+UNKNOWN_CONDITION = len(CONDITION_CODES)
+CONDITION_FACTOR_VALUES = [*CONDITION_FACTORS.values(), DEFAULT_CONDITION_FACTOR]
+
+
+def age_in_months(acquisition_date, today):
+    return (today.year - acquisition_date.year) * 12 + (today.month - acquisition_date.month)
+
+
+def depreciated_value(original_price, age, category, condition, rules):
+    """逐条计算当前价值（Decimal）"""
+    value = original_price * rules.depreciation_factor(category, age) * rules.condition_factor(condition)
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def depreciate(price_cents, ages, rule_indices, condition_codes, annual_rates, min_value_percentages):
+    """
+    向量化计算当前价值（分），返回 (按 ROUND_HALF_UP 取整的分, 需要用 Decimal 重新计算的掩码)
+
+    price_cents、ages、rule_indices、condition_codes 为等长数组；annual_rates 和
+    min_value_percentages 按规则下标排列，condition_codes 使用 CONDITION_CODES 的编码。
+    """
+    ages = np.asarray(ages, dtype=np.int64)
+    rule_indices = np.asarray(rule_indices, dtype=np.intp)
+    monthly = 1.0 - np.asarray(annual_rates, dtype=np.float64)[rule_indices] / 12.0
+    floors = np.asarray(min_value_percentages, dtype=np.float64)[rule_indices] / 100.0
+    condition_factors = np.array([float(factor) for factor in CONDITION_FACTOR_VALUES])
+
+    factors = np.power(monthly, ages)
+    depreciation = np.maximum(factors, floors)
+    values = np.asarray(price_cents, dtype=np.float64) * depreciation * condition_factors[condition_codes]
+
+    tolerance = RELATIVE_ERROR * (np.abs(ages) + RELATIVE_ERROR_MARGIN)
+    ambiguous = np.abs(values - np.floor(values) - 0.5) <= values * tolerance
+    ambiguous |= np.abs(factors - floors) <= depreciation * tolerance
+    # 超出 float64 精确整数范围的结果（长期升值）同样交给 Decimal
+    ambiguous |= ~(values < MAX_EXACT_CENTS)
+    cents = np.where(ambiguous, 0.0, np.floor(values + 0.5))
+    return cents.astype(np.int64), ambiguous
+
+
+def current_values(prices, acquisition_dates, categories, conditions, rules, today):
+    """
+    计算一批物品的当前价值，返回与输入顺序一致的 Decimal 列表
+
+    prices 为 Decimal 原价，acquisition_dates 为 date，categories 和 conditions 为字符串（可以为空）。
+    """
+    if np is None or not prices:
+        return [
+            depreciated_value(price, age_in_months(acquired, today), category, condition, rules)
+            for price, acquired, category, condition in zip(prices, acquisition_dates, categories, conditions)
+        ]
+
+    # 逐个对象的转换只使用内置函数，避免每个物品执行一次 Python 代码
+    count = len(prices)
+    rule_index = {category: index for index, category in enumerate(set(categories))}
+    rule_indices = np.fromiter(map(rule_index.__getitem__, categories), dtype=np.intp, count=count)
+    annual_rates = [float(rules.annual_rate(category)) for category in rule_index]
+    min_value_percentages = [float(rules.min_value_percentage(category)) for category in rule_index]
+    condition_index = {condition: CONDITION_CODES.get(condition, UNKNOWN_CONDITION) for condition in set(conditions)}
+    condition_codes = np.fromiter(map(condition_index.__getitem__, conditions), dtype=np.intp, count=count)
+    # 原价不超过 15 位有效数字，转换为 float 后乘 100 再取整即为精确的分
+    price_cents = np.rint(np.fromiter(map(float, prices), dtype=np.float64, count=count) * 100)
+    ordinals = np.fromiter(map(date.toordinal, acquisition_dates), dtype=np.int64, count=count)
+    acquired_months = (ordinals - EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]')
+    ages = (np.datetime64(today, 'M') - acquired_months).astype(np.int64)
+
+    cents, ambiguous = depreciate(
+        price_cents, ages, rule_indices, condition_codes, annual_rates, min_value_percentages
+    )
+    values = list(map(CENT.__mul__, map(Decimal, cents.tolist())))
+    for index in np.flatnonzero(ambiguous).tolist():
+        values[index] = depreciated_value(
+            prices[index], int(ages[index]), categories[index], conditions[index], rules
+        )
+    return values
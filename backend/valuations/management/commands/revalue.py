@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from valuations.engine import CHUNK_SIZE, RevaluationEngine
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = '批量重新估值：为估值输入有变化的物品条目生成新的估值记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='users',
+            help='只处理指定用户（用户名），可重复使用；默认处理所有用户',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'每块处理的条目数，默认 {CHUNK_SIZE}',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='并行处理的进程数，默认 1（不使用进程池）',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['users']:
+            users = dict(User.objects.filter(username__in=options['users']).values_list('username', 'id'))
+            missing = [username for username in options['users'] if username not in users]
+            if missing:
+                raise CommandError(f'用户不存在: {", ".join(missing)}')
+            user_ids = list(users.values())
+
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size 必须大于 0')
+        if options['workers'] <= 0:
+            raise CommandError('--workers 必须大于 0')
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            raise CommandError('SQLite 不支持并发写入，--workers 只能为 1')
+
+        engine = RevaluationEngine(
+            user_ids=user_ids,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            progress=self.report_progress,
+        )
+        stats = engine.run()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'估值完成：{stats.valuations} 条估值记录，{stats.unchanged} 条未变化，{stats.chunks} 块，'
+                f'{stats.rows_per_second:.0f} 条/秒'
+            )
+        )
+
+    def report_progress(self, stats):
+        self.stdout.write(
+            f'已处理 {stats.chunks} 块，{stats.valuations} 条估值记录，{stats.unchanged} 条未变化，'
+            f'{stats.rows_per_second:.0f} 条/秒'
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('valuations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='valuationrecord',
+            name='inputs_key',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddConstraint(
+            model_name='valuationrecord',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('inputs_key', ''), _negated=True),
+                fields=('entry', 'inputs_key'),
+                name='unique_entry_inputs_key',
+            ),
+        ),
+    ]
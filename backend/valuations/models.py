@@ -18,12 +18,20 @@ class ValuationRecord(models.Model):
     age_in_months = models.PositiveIntegerField()
     
     methodology = models.TextField(help_text='计算方法说明')
+    # 估值输入（原价、类别、状况、规则版本、月龄）的摘要，输入不变时复用已有记录
+    # 同一条目的摘要唯一；早于摘要的记录和导入的记录没有摘要，不受限制
+    inputs_key = models.CharField(max_length=40, blank=True, default='')
     
     class Meta:
         db_table = 'valuation_records'
         verbose_name = '价值评估记录'
         verbose_name_plural = '价值评估记录'
         ordering = ['-calculated_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['entry', 'inputs_key'], condition=~models.Q(inputs_key=''), name='unique_entry_inputs_key'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.entry.title} - {self.calculated_at.date()}"
@@ -31,6 +39,19 @@ class ValuationRecord(models.Model):
 
 class DepreciationRule(models.Model):
     """折旧规则模型"""
+    
+    # 没有对应规则时使用的类别默认年折旧率
+    DEFAULT_RULES = {
+        '电子产品': 0.25,  # 25%年折旧率
+        '汽车': 0.15,
+        '家具': 0.10,
+        '服装': 0.30,
+        '书籍': 0.05,
+        '艺术品': -0.05,  # 可能升值
+        '珠宝': 0.02,
+        '其他': 0.12,
+    }
+    
     category = models.CharField(max_length=100, unique=True)
     annual_rate = models.DecimalField(max_digits=5, decimal_places=4, help_text='年折旧率')
     min_value_percentage = models.DecimalField(
@@ -51,13 +72,4 @@ class DepreciationRule(models.Model):
     @classmethod
     def get_default_rules(cls):
         """获取默认折旧规则"""
-        return {
-            '电子产品': 0.25,  # 25%年折旧率
-            '汽车': 0.15,
-            '家具': 0.10,
-            '服装': 0.30,
-            '书籍': 0.05,
-            '艺术品': -0.05,  # 可能升值
-            '珠宝': 0.02,
-            '其他': 0.12,
-        }
\ No newline at end of file
+        return cls.DEFAULT_RULES
@@ -0,0 +1,65 @@
+"""
+物品组合估值汇总
+
+一次查询读取用户全部可估值物品的估值列，当前价值由 kernel.current_values 按当前规则一次算出，
+不读取也不写入估值记录。按货币、类别和状况分组合计原价和当前价值；不同货币的金额不相加。
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from .engine import eligible_items
+from .kernel import CENT, current_values
+
+PORTFOLIO_FIELDS = ['original_price', 'acquisition_date', 'category', 'condition', 'currency']
+
+
+def _group_rows(totals, key_name):
+    rows = [
+        {key_name: key, 'currency': currency, **_format(total)}
+        for (key, currency), total in totals.items()
+    ]
+    return sorted(rows, key=lambda row: (row['currency'], row[key_name] or ''))
+
+
+def _format(total):
+    count, original, current = total
+    return {
+        'count': count,
+        'original_value': str(original.quantize(CENT)),
+        'current_value': str(current.quantize(CENT)),
+    }
+
+
+def portfolio_summary(user_id, rules, today):
+    """
+    用户物品组合的估值汇总
+
+    返回 totals（按货币）、by_category 和 by_condition（按 (类别或状况, 货币)）三组合计，
+    每组包含物品数、原价合计和当前价值合计。
+    """
+    rows = list(eligible_items([user_id], today).order_by().values_list(*PORTFOLIO_FIELDS))
+    if rows:
+        prices, acquisition_dates, categories, conditions, currencies = zip(*rows)
+        values = current_values(prices, acquisition_dates, categories, conditions, rules, today)
+    else:
+        prices = categories = conditions = currencies = values = ()
+
+    def empty():
+        return [0, Decimal(0), Decimal(0)]
+
+    totals = defaultdict(empty)
+    by_category = defaultdict(empty)
+    by_condition = defaultdict(empty)
+    for price, category, condition, currency, value in zip(prices, categories, conditions, currencies, values):
+        for total in (totals[currency], by_category[category, currency], by_condition[condition, currency]):
+            total[0] += 1
+            total[1] += price
+            total[2] += value
+
+    return {
+        'valued_on': today.isoformat(),
+        'count': len(rows),
+        'totals': {currency: _format(total) for currency, total in sorted(totals.items())},
+        'by_category': _group_rows(by_category, 'category'),
+        'by_condition': _group_rows(by_condition, 'condition'),
+    }
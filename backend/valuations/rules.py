@@ -0,0 +1,128 @@
+"""
+折旧规则注册表
+
+进程内保存整张 depreciation_rules 表，估值和规则列表接口直接读取，不查询数据库。
+每隔 CHECK_INTERVAL 秒重新查询一次规则表（只有几十行），内容有变化时替换，管理后台的修改几秒内对所有进程生效；
+本进程保存或删除规则后（post_save / post_delete）立即失效。
+
+事务中修改规则时，该线程在事务结束前读取的是不缓存的规则表：提交后由 on_commit 失效，
+回滚时没有回调，事务结束后第一次读取时丢弃缓存，不会留下回滚掉的规则。
+"""
+import hashlib
+import threading
+import time
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from .models import DepreciationRule
+
+# 重新查询规则表的间隔（秒）
+CHECK_INTERVAL = 5
+
+# 物品状况对应的价值因子，未填写状况时按良好处理
+CONDITION_FACTORS = {
+    'new': Decimal('1.0'),
+    'excellent': Decimal('0.9'),
+    'good': Decimal('0.75'),
+    'fair': Decimal('0.6'),
+    'poor': Decimal('0.4'),
+}
+DEFAULT_CONDITION_FACTOR = Decimal('0.75')
+
+# 没有折旧规则时使用的默认值；年折旧率优先使用 DepreciationRule.get_default_rules() 中的类别默认值
+DEFAULT_ANNUAL_RATE = Decimal('0.12')
+DEFAULT_MIN_VALUE_PERCENTAGE = Decimal('10.0')
+
+
+class RuleTable:
+    """折旧规则表：按类别查询年折旧率和最低价值百分比，缺少规则时使用默认值；按状况查询状况因子"""
+
+    def __init__(self, rules=()):
+        self.rule_list = list(rules)
+        self.rules = {rule.category: (rule.annual_rate, rule.min_value_percentage) for rule in self.rule_list}
+        self.default_rates = {
+            category: Decimal(str(rate)) for category, rate in DepreciationRule.get_default_rules().items()
+        }
+        self._factors = {}
+
+    @cached_property
+    def version(self):
+        """规则内容的摘要，各进程加载相同的规则得到相同的版本，可用于缓存键"""
+        content = repr(sorted(self.rules.items())) + repr(sorted(self.default_rates.items()))
+        return hashlib.sha1(content.encode()).hexdigest()[:16]
+
+    @classmethod
+    def load(cls):
+        """从数据库加载全部规则"""
+        return cls(DepreciationRule.objects.order_by('id'))
+
+    def annual_rate(self, category):
+        rule = self.rules.get(category)
+        return rule[0] if rule else self.default_rates.get(category, DEFAULT_ANNUAL_RATE)
+
+    def min_value_percentage(self, category):
+        rule = self.rules.get(category)
+        return rule[1] if rule else DEFAULT_MIN_VALUE_PERCENTAGE
+
+    def condition_factor(self, condition):
+        return CONDITION_FACTORS.get(condition, DEFAULT_CONDITION_FACTOR)
+
+    def depreciation_factor(self, category, age_in_months):
+        """按月复利折旧后的价值比例，不低于最低价值百分比"""
+        key = (category, age_in_months)
+        factor = self._factors.get(key)
+        if factor is None:
+            monthly_rate = self.annual_rate(category) / 12
+            factor = max((1 - monthly_rate) ** age_in_months, self.min_value_percentage(category) / 100)
+            self._factors[key] = factor
+        return factor
+
+
+class RuleRegistry:
+    """进程内的折旧规则表，首次读取时加载，失效后或每隔 check_interval 秒重新查询"""
+
+    def __init__(self, check_interval=CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._table = None
+        self._checked_at = 0.0
+
+    def get(self):
+        """返回当前的 RuleTable；距上次检查不到 check_interval 秒时不访问数据库"""
+        if getattr(self._local, 'pending', False):
+            if transaction.get_connection().in_atomic_block:
+                # 本线程的规则修改还没有提交，不缓存读到的规则
+                return RuleTable.load()
+            # 事务已结束（提交或回滚），丢弃期间可能缓存的规则表
+            self._local.pending = False
+            self._table = None
+        table = self._table
+        if table is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return table
+        with self._lock:
+            rules = list(DepreciationRule.objects.order_by('id'))
+            if self._table is None or _rule_values(rules) != _rule_values(self._table.rule_list):
+                self._table = RuleTable(rules)
+            self._checked_at = time.monotonic()
+            return self._table
+
+    def invalidate(self):
+        """使本进程的规则表失效；在事务中时提交后再失效一次，事务结束前本线程不缓存规则表"""
+        self._table = None
+        if transaction.get_connection().in_atomic_block:
+            self._local.pending = True
+            transaction.on_commit(self._committed)
+
+    def _committed(self):
+        self._local.pending = False
+        self._table = None
+
+
+def _rule_values(rules):
+    return [(rule.pk, rule.category, rule.annual_rate, rule.min_value_percentage) for rule in rules]
+
+
+rule_registry = RuleRegistry()
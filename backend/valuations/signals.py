@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DepreciationRule
+from .rules import rule_registry
+
+
+@receiver(post_save, sender=DepreciationRule)
+@receiver(post_delete, sender=DepreciationRule)
+def reload_rules_on_change(sender, **kwargs):
+    """折旧规则变化时使本进程的规则表失效，其他进程在检查间隔内重新查询"""
+    rule_registry.invalidate()
@@ -0,0 +1,339 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+from hypothesis import example, given, strategies as st, settings
+from entries.models import Entry
+from .engine import RevaluationEngine
+from .kernel import age_in_months, current_values, depreciated_value
+from .models import DepreciationRule, ValuationRecord
+from .rules import CONDITION_FACTORS, RuleTable
+from .utils import ValuationCalculator
+
+User = get_user_model()
+
+# 依赖响应缓存的测试使用进程内缓存，不受运行配置（例如开发环境的 DummyCache）影响
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'entries': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'entries-test'},
+}
+
+
+def months_ago(months):
+    today = timezone.localdate()
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    return date(year, month + 1, 1)
+
+
+class ValuationEngineTest(TestCase):
+    """价值评估测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            DepreciationRule.objects.create(
+                category='家具', annual_rate=Decimal('0.10'), min_value_percentage=Decimal('20.00')
+            )
+        self.phone = Entry.objects.create(
+            user=self.user, type='item', title='手机', category='电子产品', condition='good',
+            original_price=Decimal('1000.00'), acquisition_date=months_ago(12)
+        )
+        self.desk = Entry.objects.create(
+            user=self.user, type='item', title='书桌', category='家具', condition='new',
+            original_price=Decimal('1999.99'), acquisition_date=months_ago(24)
+        )
+        self.lamp = Entry.objects.create(
+            user=self.other, type='item', title='台灯', category='家具',
+            original_price=Decimal('100.00'), acquisition_date=months_ago(600)
+        )
+        # 不符合估值条件的条目
+        Entry.objects.create(user=self.user, type='item', title='没有原价', acquisition_date=months_ago(1))
+        Entry.objects.create(user=self.user, type='item', title='没有日期', original_price=Decimal('10.00'))
+        Entry.objects.create(user=self.user, type='person', title='张三', original_price=Decimal('10.00'))
+
+    def test_calculate_valuation(self):
+        """测试单个条目估值使用 Decimal 计算并四舍五入到分"""
+        valuation = ValuationCalculator().calculate_valuation(self.phone)
+        self.assertEqual(valuation.current_value, Decimal('582.56'))
+        self.assertEqual(valuation.depreciation_rate, Decimal('0.25'))
+        self.assertEqual(valuation.condition_factor, Decimal('0.75'))
+        self.assertEqual(valuation.age_in_months, 12)
+        self.assertEqual(valuation.methodology, '使用电子产品类别的年折旧率25.0%，状况因子0.75，物品年龄12个月进行计算')
+
+        with self.assertRaises(ValueError):
+            ValuationCalculator().calculate_valuation(Entry.objects.get(title='没有日期'))
+
+    def test_revaluation_engine(self):
+        """测试批量估值按块写入全部符合条件的条目，结果与单个估值一致"""
+        progress = []
+        stats = RevaluationEngine(chunk_size=2, progress=lambda stats: progress.append(stats.valuations)).run()
+        self.assertEqual((stats.valuations, stats.chunks), (3, 2))
+        self.assertEqual(progress, [2, 3])
+
+        values = dict(ValuationRecord.objects.values_list('entry__title', 'current_value'))
+        # 折旧到最低价值百分比为止，未填写状况按良好计算
+        self.assertEqual(values, {'手机': Decimal('582.56'), '书桌': Decimal('1636.08'), '台灯': Decimal('15.00')})
+        self.assertEqual(
+            ValuationCalculator().calculate_valuation(self.phone).current_value,
+            self.phone.valuations.last().current_value
+        )
+
+        # 输入没有变化的条目不重复写入
+        stats = RevaluationEngine(user_ids=[self.other.pk]).run()
+        self.assertEqual((stats.valuations, stats.unchanged), (0, 1))
+        self.assertEqual(self.lamp.valuations.count(), 1)
+
+        self.lamp.condition = 'poor'
+        self.lamp.save()
+        stats = RevaluationEngine().run()
+        self.assertEqual((stats.valuations, stats.unchanged), (1, 2))
+        self.assertEqual(self.lamp.valuations.first().current_value, Decimal('8.00'))
+
+    def test_revalue_command_and_api(self):
+        """测试 revalue 命令和批量估值接口，批量写入后使用户的响应缓存失效"""
+        from entries.cache import get_generation
+        
+        Entry.objects.create(
+            user=self.user, type='item', title='未来', original_price=Decimal('1.00'),
+            acquisition_date=timezone.localdate() + timedelta(days=40)
+        )
+        out = StringIO()
+        call_command('revalue', user=['owner'], chunk_size=1, stdout=out)
+        self.assertIn('估值完成：2 条估值记录，0 条未变化，2 块', out.getvalue())
+        self.assertFalse(ValuationRecord.objects.filter(entry__user=self.other).exists())
+        self.assertFalse(ValuationRecord.objects.filter(entry__title='未来').exists())
+
+        client = APIClient()
+        client.force_authenticate(user=self.other)
+        generation = get_generation(self.other.pk)
+        response = client.post(reverse('revalue'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'valuations': 1, 'unchanged': 0})
+        self.assertEqual(self.lamp.valuations.count(), 1)
+        self.assertNotEqual(get_generation(self.other.pk), generation)
+
+        response = client.post(reverse('revalue'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'valuations': 0, 'unchanged': 1})
+
+    def test_valuation_reuse(self):
+        """测试 GET 只读计算，POST 在输入未变化时返回已有记录"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        detail_url = reverse('valuation-detail', args=[self.phone.pk])
+        calculate_url = reverse('calculate-valuation', args=[self.phone.pk])
+
+        response = client.get(detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['id'])
+        self.assertEqual(response.data['current_value'], '582.56')
+        self.assertFalse(ValuationRecord.objects.exists())
+
+        response = client.post(calculate_url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        record_id = response.data['id']
+        response = client.post(calculate_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], record_id)
+        self.assertEqual(client.get(detail_url).data['id'], record_id)
+        self.assertEqual(self.phone.valuations.count(), 1)
+
+        # 状况或折旧规则变化后重新计算
+        self.phone.condition = 'new'
+        self.phone.save()
+        response = client.post(calculate_url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['current_value'], '776.75')
+
+        desk_url = reverse('calculate-valuation', args=[self.desk.pk])
+        self.assertEqual(client.post(desk_url).status_code, status.HTTP_201_CREATED)
+        rule = DepreciationRule.objects.get(category='家具')
+        rule.annual_rate = Decimal('0.20')
+        rule.save()
+        self.assertEqual(client.post(desk_url).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.desk.valuations.count(), 2)
+
+        no_date = Entry.objects.get(title='没有日期')
+        self.assertEqual(client.get(reverse('valuation-detail', args=[no_date.pk])).status_code, 404)
+        self.assertEqual(
+            client.post(reverse('calculate-valuation', args=[no_date.pk])).status_code, status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_unique_inputs_key(self):
+        """测试同一条目相同输入的估值记录唯一，并发写入时返回已有记录"""
+        calculator = ValuationCalculator()
+        record = calculator.calculate_valuation(self.phone)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            calculator.build_valuation(self.phone).save()
+
+        # 检查之后、写入之前其他请求已经写入了相同输入的记录
+        with mock.patch('django.db.models.query.QuerySet.first', return_value=None):
+            self.assertEqual(calculator.get_or_calculate(self.phone), (record, False))
+        self.assertEqual(self.phone.valuations.count(), 1)
+
+        # 没有输入摘要的记录（早于摘要或导入的记录）不受限制
+        for _ in range(2):
+            ValuationRecord.objects.create(
+                entry=self.phone, original_price=Decimal('1000.00'), current_value=Decimal('600.00'),
+                depreciation_rate=Decimal('0.2500'), age_in_months=12, methodology='导入'
+            )
+        self.assertEqual(self.phone.valuations.count(), 3)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_portfolio(self):
+        """测试物品组合汇总按货币、类别和状况合计，不写入估值记录，结果按用户缓存"""
+        from .rules import rule_registry
+
+        Entry.objects.create(
+            user=self.user, type='item', title='相机', category='电子产品', condition='good', currency='USD',
+            original_price=Decimal('500.00'), acquisition_date=months_ago(12)
+        )
+        rule_registry.get()
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with self.assertNumQueries(1):
+            response = client.get(reverse('valuation-portfolio'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['totals'], {
+            'CNY': {'count': 2, 'original_value': '2999.99', 'current_value': '2218.64'},
+            'USD': {'count': 1, 'original_value': '500.00', 'current_value': '291.28'},
+        })
+        self.assertEqual(response.data['by_category'], [
+            {'category': '家具', 'currency': 'CNY', 'count': 1, 'original_value': '1999.99', 'current_value': '1636.08'},
+            {'category': '电子产品', 'currency': 'CNY', 'count': 1, 'original_value': '1000.00', 'current_value': '582.56'},
+            {'category': '电子产品', 'currency': 'USD', 'count': 1, 'original_value': '500.00', 'current_value': '291.28'},
+        ])
+        self.assertEqual(
+            [(row['condition'], row['currency'], row['count']) for row in response.data['by_condition']],
+            [('good', 'CNY', 1), ('new', 'CNY', 1), ('good', 'USD', 1)]
+        )
+        self.assertFalse(ValuationRecord.objects.exists())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(reverse('valuation-portfolio')).data, response.data)
+
+        self.desk.delete()
+        response = client.get(reverse('valuation-portfolio'))
+        self.assertEqual(response.data['totals']['CNY']['count'], 1)
+
+
+class RuleRegistryTest(TestCase):
+    """折旧规则注册表测试"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rule = DepreciationRule.objects.create(
+                category='家具', annual_rate=Decimal('0.10'), min_value_percentage=Decimal('20.00')
+            )
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+
+    def test_lookup_without_queries(self):
+        """测试规则表只加载一次，估值和规则列表不再查询规则"""
+        from .rules import rule_registry
+
+        with self.assertNumQueries(1):
+            rule_registry.get()
+        with self.assertNumQueries(0):
+            table = rule_registry.get()
+        self.assertEqual(table.annual_rate('家具'), Decimal('0.10'))
+        self.assertEqual(table.annual_rate('电子产品'), Decimal('0.25'))
+        self.assertEqual(table.min_value_percentage('电子产品'), Decimal('10.0'))
+
+        entry = Entry.objects.create(
+            user=self.user, type='item', title='书桌', category='家具',
+            original_price=Decimal('100.00'), acquisition_date=months_ago(1)
+        )
+        # 查询已有记录和写入新记录，不查询规则
+        # 查询已有记录，在保存点中写入新记录，不查询规则
+        with self.assertNumQueries(4):
+            ValuationCalculator().calculate_valuation(entry)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with self.assertNumQueries(0):
+            response = client.get(reverse('depreciation-rules'))
+        self.assertEqual([rule['category'] for rule in response.data['results']], ['家具'])
+
+    def test_reload_on_change(self):
+        """测试规则修改后本进程立即重新加载，其他进程在检查间隔后重新加载"""
+        from .rules import RuleRegistry, rule_registry
+
+        other_process = RuleRegistry(check_interval=0)
+        idle_process = RuleRegistry(check_interval=3600)
+        for registry in [rule_registry, other_process, idle_process]:
+            self.assertEqual(registry.get().annual_rate('家具'), Decimal('0.10'))
+
+        self.rule.annual_rate = Decimal('0.20')
+        self.rule.save()
+        self.assertEqual(rule_registry.get().annual_rate('家具'), Decimal('0.20'))
+        self.assertEqual(other_process.get().annual_rate('家具'), Decimal('0.20'))
+        self.assertEqual(idle_process.get().annual_rate('家具'), Decimal('0.10'))
+
+        self.rule.delete()
+        self.assertEqual(rule_registry.get().annual_rate('家具'), Decimal('0.10'))
+        self.assertEqual(other_process.get().rule_list, [])
+
+    def test_rollback_not_cached(self):
+        """测试回滚的规则修改不会留在规则表中"""
+        from .rules import rule_registry
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                DepreciationRule.objects.create(category='汽车', annual_rate=Decimal('0.50'))
+                self.assertEqual(rule_registry.get().annual_rate('汽车'), Decimal('0.50'))
+                raise RuntimeError
+        self.assertFalse(DepreciationRule.objects.filter(category='汽车').exists())
+        self.assertEqual(rule_registry.get().annual_rate('汽车'), Decimal('0.15'))
+        self.assertEqual(rule_registry.get().annual_rate('汽车'), Decimal('0.15'))
+
+
+class ValuationKernelPropertyTest(SimpleTestCase):
+    """向量化估值与逐条 Decimal 估值的一致性测试"""
+
+    items = st.tuples(
+        st.decimals(min_value='0.01', max_value='99999999.99', places=2),
+        st.integers(min_value=0, max_value=1200),
+        st.sampled_from(['规则', '电子产品', '艺术品', '未知类别']),
+        st.sampled_from([*CONDITION_FACTORS, None, '']),
+    )
+
+    @given(
+        annual_rate=st.decimals(min_value='-0.05', max_value='0.99', places=4),
+        min_value_percentage=st.decimals(min_value='0', max_value='100', places=2),
+        batch=st.lists(items, min_size=1, max_size=50),
+    )
+    @example(annual_rate=Decimal('0'), min_value_percentage=Decimal('0'), batch=[
+        # 结果恰好是半分：2 分 × 0.75 = 1.5 分，6 分 × 0.75 = 4.5 分，10 分 × 0.75 = 7.5 分
+        (Decimal('0.02'), 0, '规则', 'good'),
+        (Decimal('0.06'), 0, '规则', None),
+        (Decimal('0.10'), 0, '规则', 'good'),
+    ])
+    @example(annual_rate=Decimal('0.1200'), min_value_percentage=Decimal('50'), batch=[
+        # 折旧因子接近最低价值比例
+        (Decimal('99999999.99'), 70, '规则', 'new'),
+    ])
+    @settings(max_examples=200, deadline=None)
+    def test_vectorized_matches_decimal(self, annual_rate, min_value_percentage, batch):
+        """测试向量化结果与 Decimal 逐条计算逐分一致"""
+        rules = RuleTable([
+            DepreciationRule(category='规则', annual_rate=annual_rate, min_value_percentage=min_value_percentage)
+        ])
+        today = timezone.localdate()
+        dates = [months_ago(age) for _, age, _, _ in batch]
+        prices, _, categories, conditions = zip(*batch)
+
+        expected = [
+            depreciated_value(price, age_in_months(acquired, today), category, condition, rules)
+            for price, acquired, category, condition in zip(prices, dates, categories, conditions)
+        ]
+        self.assertEqual(current_values(prices, dates, categories, conditions, rules, today), expected)
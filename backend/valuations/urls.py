@@ -5,5 +5,7 @@ urlpatterns = [
     path('<int:entry_id>/', views.ValuationDetailView.as_view(), name='valuation-detail'),
     path('<int:entry_id>/calculate/', views.CalculateValuationView.as_view(), name='calculate-valuation'),
     path('<int:entry_id>/history/', views.ValuationHistoryView.as_view(), name='valuation-history'),
+    path('portfolio/', views.PortfolioView.as_view(), name='valuation-portfolio'),
+    path('revalue/', views.RevalueView.as_view(), name='revalue'),
     path('rules/', views.DepreciationRuleListView.as_view(), name='depreciation-rules'),
 ]
\ No newline at end of file
@@ -1,12 +1,18 @@
 from rest_framework import generics, status
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from datetime import date
 from decimal import Decimal
+from entries import cache as entry_cache
 from entries.models import Entry
-from .models import ValuationRecord, DepreciationRule
+from .models import ValuationRecord
 from .serializers import ValuationRecordSerializer, DepreciationRuleSerializer
+from .engine import RevaluationEngine
+from .portfolio import portfolio_summary
+from .rules import rule_registry
 from .utils import ValuationCalculator
 
 
@@ -19,14 +25,15 @@ class ValuationDetailView(generics.RetrieveAPIView):
         entry_id = self.kwargs['entry_id']
         entry = get_object_or_404(Entry, id=entry_id, user=self.request.user)
         
-        # 获取最新的价值评估记录
-        latest_valuation = entry.valuations.first()
-        if not latest_valuation:
-            # 如果没有评估记录，自动计算一个
-            calculator = ValuationCalculator()
-            latest_valuation = calculator.calculate_valuation(entry)
-        
-        return latest_valuation
+        # 按当前输入估值，不写入数据库：输入未变化时返回已有记录，否则返回临时计算的结果
+        try:
+            return ValuationCalculator().current_valuation(entry)
+        except ValueError:
+            # 条目已不能估值（例如删除了原价）时返回最近的评估记录
+            latest_valuation = entry.valuations.first()
+            if latest_valuation is None:
+                raise NotFound('该条目没有价值评估')
+            return latest_valuation
 
 
 class CalculateValuationView(generics.CreateAPIView):
@@ -42,11 +49,41 @@ class CalculateValuationView(generics.CreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if not entry.acquisition_date:
+            return Response({'error': '请先填写获得日期'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 输入未变化时返回已有记录（200），否则写入新记录（201）
         calculator = ValuationCalculator()
-        valuation = calculator.calculate_valuation(entry)
+        valuation, created = calculator.get_or_calculate(entry)
         
         serializer = ValuationRecordSerializer(valuation)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class RevalueView(generics.GenericAPIView):
+    """批量重新估值视图 - 为当前用户估值输入有变化的物品生成新的估值记录"""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        stats = RevaluationEngine(user_ids=[request.user.pk]).run()
+        return Response(
+            {'valuations': stats.valuations, 'unchanged': stats.unchanged},
+            status=status.HTTP_201_CREATED if stats.valuations else status.HTTP_200_OK
+        )
+
+
+class PortfolioView(generics.GenericAPIView):
+    """物品组合估值汇总视图 - 按当前规则计算，不写入估值记录，按用户缓存"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        today = timezone.localdate()
+        rules = rule_registry.get()
+        return entry_cache.cached_response(
+            request, 'valuation_portfolio',
+            lambda: Response(portfolio_summary(request.user.pk, rules, today)),
+            variant=f'{today.isoformat()}:{rules.version}'
+        )
 
 
 class ValuationHistoryView(generics.ListAPIView):
@@ -61,7 +98,9 @@ class ValuationHistoryView(generics.ListAPIView):
 
 
 class DepreciationRuleListView(generics.ListAPIView):
-    """折旧规则列表视图"""
-    queryset = DepreciationRule.objects.all()
+    """折旧规则列表视图 - 从进程内的规则注册表读取"""
     serializer_class = DepreciationRuleSerializer
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return rule_registry.get().rule_list
\ No newline at end of file